@@ -28,7 +28,8 @@ class SerialRX(multiprocessing.Process):
         """
         Constructor of the SerialRX class
 
-        :param output_queue: multiprocessing.Queue containing the data received from serial port
+        :param output_queue: multiprocessing.Queue containing the data received from serial port. If the queue is
+                             bounded (maxsize > 0) the oldest data is dropped when it is full.
         :param port: specifies the serial port
         :param baudrate: specifies the baudrate
         """
@@ -63,9 +64,8 @@ class SerialRX(multiprocessing.Process):
         # While exit event is not set...
         while not self._exit.is_set():
             if s.inWaiting():
-                self._clear_queue(self._output_queue)
                 buf = s.readline().strip('\n')
-                self._output_queue.put(buf)
+                self._put_latest(self._output_queue, buf)
 
     def terminate(self):
         """
@@ -75,18 +75,23 @@ class SerialRX(multiprocessing.Process):
         self._exit.set()
 
     @staticmethod
-    def _clear_queue(some_queue):
+    def _put_latest(some_queue, item):
         """
-        Clears the multiprocessing queue passed to the method
+        Puts an item into the multiprocessing queue passed to the method, dropping the oldest item if the queue is full
 
-        :param some_queue: multiprocessing.Queue to be cleared
+        :param some_queue: multiprocessing.Queue the item is put into
+        :param item: item to be put into the queue
         """
 
-        while not some_queue.empty():
+        while True:
             try:
-                some_queue.get_nowait()
-            except Queue.Empty:
-                pass
+                some_queue.put_nowait(item)
+                return
+            except Queue.Full:
+                try:
+                    some_queue.get_nowait()
+                except Queue.Empty:
+                    pass
 
 if __name__ == '__main__':
     import argparse
@@ -105,8 +110,8 @@ if __name__ == '__main__':
                         help='Specify baudrate')
     args = parser.parse_args()
 
-    # Initialize an output queue
-    output_queue = multiprocessing.Queue()
+    # Initialize an output queue holding only the latest reading
+    output_queue = multiprocessing.Queue(maxsize=1)
 
     # Initialize and start SerialRX process
     serialrx = SerialRX(output_queue=output_queue,
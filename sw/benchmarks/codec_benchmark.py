@@ -0,0 +1,97 @@
+"""
+Benchmark comparing encode/decode time and bytes per frame of the ZMQ stream codecs on recorded frames.
+
+Run from the sw directory:
+
+    python -m benchmarks.codec_benchmark -i recording.avi -k camera_image
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from benchmarks.frames import load_frames
+from zmq_socket.codec import get_codec, lz4
+from zmq_socket.message import pack_message, unpack_message
+
+DEFAULT_CODECS = ['none', 'zlib:1', 'zlib:6', 'lz4', 'png:1', 'jpeg:90']
+
+
+def _nbytes(frame):
+    """
+    Returns the size of a message frame in bytes
+    """
+    if isinstance(frame, np.ndarray):
+        return frame.nbytes
+    return len(frame)
+
+
+def benchmark_codec(frames, spec, key='camera_image'):
+    """
+    Measures encode/decode time and message size of a codec
+
+    :param frames: array of shape (T, H, W) holding the recorded frames
+    :param spec: codec spec (see zmq_socket.codec)
+    :param key: key of the frames in the data dict
+    :return: mean encode time (s), mean decode time (s), mean bytes per frame
+    """
+    codecs = {key: get_codec(spec)}
+    encode_time = 0.0
+    decode_time = 0.0
+    size = 0
+
+    for frame in frames:
+        data = {key: frame, 't_stamp': 0.0}
+
+        start = timeit.default_timer()
+        message = pack_message(data, codecs)
+        encode_time += timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        unpack_message(message)
+        decode_time += timeit.default_timer() - start
+
+        size += sum(_nbytes(f) for f in message)
+
+    n = float(len(frames))
+    return encode_time / n, decode_time / n, size / n
+
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i', '--input',
+                        required=True,
+                        type=str,
+                        dest='input',
+                        help='Specify the recorded frames (video file or .npy stack)')
+    parser.add_argument('-k', '--key',
+                        default='camera_image',
+                        type=str,
+                        dest='key',
+                        help='Specify the key the frames are sent as')
+    parser.add_argument('-c', '--codecs',
+                        default=DEFAULT_CODECS,
+                        nargs='+',
+                        type=str,
+                        dest='codecs',
+                        help='Specify the codecs to compare')
+    parser.add_argument('-n', '--max-frames',
+                        default=200,
+                        type=int,
+                        dest='max_frames',
+                        help='Specify the maximum number of frames')
+    args = parser.parse_args()
+
+    frames = load_frames(args.input, args.max_frames)
+    print '%d frames of %dx%d' % (frames.shape[0], frames.shape[2], frames.shape[1])
+
+    print '{:>10} {:>12} {:>12} {:>14} {:>8}'.format('codec', 'encode [ms]', 'decode [ms]', 'bytes/frame', 'ratio')
+    for spec in args.codecs:
+        if spec.startswith('lz4') and lz4 is None:
+            print '{:>10} skipped (lz4 package not installed)'.format(spec)
+            continue
+        encode_time, decode_time, size = benchmark_codec(frames, spec, args.key)
+        print '{:>10} {:>12.3f} {:>12.3f} {:>14.0f} {:>8.2f}'.format(spec, encode_time * 1e3, decode_time * 1e3,
+                                                                     size, frames[0].nbytes / size)
@@ -0,0 +1,114 @@
+"""
+Benchmark comparing the per-frame update time of an EMDBank with N tunings against N separate EMD instances per
+pyramid level that are updated one after another.
+
+Run from the sw directory:
+
+    python -m benchmarks.emd_bank_benchmark -s 128x32 512x128 -t 2 4 8
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks.emd_benchmark import benchmark_emd
+from image_processing.motion_detection.EMD import EMD
+from image_processing.motion_detection.EMDBank import EMDBank
+
+
+def make_tunings(n, hp_rc=5.0):
+    """
+    Creates n velocity tunings with low-pass filter RCs spaced by factors of two and a common high-pass filter RC
+
+    :param n: number of tunings
+    :param hp_rc: high-pass filter RC shared by all tunings
+    :return: list of (lp_rc, hp_rc) pairs
+    """
+    return [(2.5 * 2 ** i, hp_rc) for i in range(n)]
+
+
+class SeparateEMDs(object):
+    """
+    Runs one EMD instance per tuning and pyramid level one after another and averages their nearness maps at the full
+    resolution, which is what an EMDBank replaces
+    """
+
+    def __init__(self, width, height, tunings, levels=1):
+        """
+        :param width: width of the image/EMD
+        :param height: height of the image/EMD
+        :param tunings: sequence of (lp_rc, hp_rc) pairs
+        :param levels: number of image pyramid levels
+        """
+        self._width = width
+        self._height = height
+        self._levels = []
+        level_width, level_height = width, height
+        for _ in range(levels):
+            self._levels.append([EMD(None, None, level_width, level_height, lp_rc=lp_rc, lp_dt=1.0, hp_rc=hp_rc,
+                                     hp_dt=1.0)
+                                 for lp_rc, hp_rc in tunings])
+            level_width, level_height = (level_width + 1) // 2, (level_height + 1) // 2
+        self._combined = np.zeros(shape=(height, width), dtype=np.float32)
+
+    def update(self, img):
+        """
+        :param img: input image of shape (height, width)
+        :return: nearness map averaged over tunings and levels
+        """
+        self._combined[...] = 0
+        for index, emds in enumerate(self._levels):
+            if index > 0:
+                img = cv2.pyrDown(img)
+            for emd in emds:
+                nearness_map = emd.update(img)['nearness_map']
+                if index > 0:
+                    nearness_map = cv2.resize(nearness_map, (self._width, self._height),
+                                              interpolation=cv2.INTER_LINEAR)
+                np.add(self._combined, nearness_map, out=self._combined)
+        np.multiply(self._combined, 1.0 / sum(len(emds) for emds in self._levels), out=self._combined)
+        return self._combined
+
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--sizes',
+                        default=['128x32', '512x128'],
+                        nargs='+',
+                        type=str,
+                        dest='sizes',
+                        help='Specify the EMD sizes as WIDTHxHEIGHT')
+    parser.add_argument('-t', '--tunings',
+                        default=[2, 4, 8],
+                        nargs='+',
+                        type=int,
+                        dest='tunings',
+                        help='Specify the numbers of tunings of the bank')
+    parser.add_argument('-l', '--levels',
+                        default=[1, 3],
+                        nargs='+',
+                        type=int,
+                        dest='levels',
+                        help='Specify the numbers of pyramid levels of the bank')
+    parser.add_argument('-n', '--number',
+                        default=50,
+                        type=int,
+                        dest='number',
+                        help='Specify the number of frames per timing run')
+    args = parser.parse_args()
+
+    print '{:>12} {:>8} {:>8} {:>14} {:>14} {:>10}'.format('size', 'tunings', 'levels', 'separate [ms]',
+                                                          'bank [ms]', 'ratio')
+    for size in args.sizes:
+        width, height = map(int, size.split('x'))
+
+        for n in args.tunings:
+            for levels in args.levels:
+                separate = benchmark_emd(SeparateEMDs(width, height, make_tunings(n), levels), width, height,
+                                         number=args.number)
+                bank = EMDBank(None, None, width, height, make_tunings(n), lp_dt=1.0, hp_dt=1.0, levels=levels)
+                latency = benchmark_emd(bank, width, height, number=args.number)
+                print '{:>12} {:>8} {:>8} {:>14.3f} {:>14.3f} {:>10.2f}'.format(size, n, levels, separate * 1e3,
+                                                                                latency * 1e3, latency / separate)
@@ -0,0 +1,76 @@
+"""
+Benchmark measuring the per-frame update time of the EMD and of the TiledEMD with different numbers of bands.
+
+Run from the sw directory:
+
+    python -m benchmarks.emd_benchmark -s 128x32 1024x256 -b 1 2 4
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from image_processing.motion_detection.EMD import EMD
+from image_processing.motion_detection.TiledEMD import TiledEMD
+
+
+def benchmark_emd(emd, width, height, repeat=5, number=50):
+    """
+    Measures the per-frame update time of an EMD instance
+
+    :param emd: EMD instance (not started)
+    :param width: width of the image/EMD
+    :param height: height of the image/EMD
+    :param repeat: number of timing runs
+    :param number: number of frames processed per timing run
+    :return: best per-frame update time in seconds
+    """
+    frames = np.random.randint(0, 256, size=(number, height, width)).astype(np.uint8)
+    frames = iter(frames[np.arange(repeat * number + 1) % number])
+
+    # Warm up (starts the workers of a TiledEMD)
+    emd.update(next(frames))
+
+    timings = timeit.repeat(lambda: emd.update(next(frames)), repeat=repeat, number=number)
+    return min(timings) / number
+
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--sizes',
+                        default=['128x32', '512x128', '1024x256'],
+                        nargs='+',
+                        type=str,
+                        dest='sizes',
+                        help='Specify the EMD sizes as WIDTHxHEIGHT')
+    parser.add_argument('-b', '--bands',
+                        default=[1, 2, 4],
+                        nargs='+',
+                        type=int,
+                        dest='bands',
+                        help='Specify the numbers of bands of the TiledEMD')
+    parser.add_argument('-n', '--number',
+                        default=50,
+                        type=int,
+                        dest='number',
+                        help='Specify the number of frames per timing run')
+    args = parser.parse_args()
+
+    print '{:>12} {:>12} {:>12} {:>10}'.format('size', 'emd', 'ms/frame', 'speedup')
+    for size in args.sizes:
+        width, height = map(int, size.split('x'))
+
+        emd = EMD(None, None, width, height, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0)
+        baseline = benchmark_emd(emd, width, height, number=args.number)
+        print '{:>12} {:>12} {:>12.3f} {:>10.2f}'.format(size, 'EMD', baseline * 1e3, 1.0)
+
+        for bands in args.bands:
+            emd = TiledEMD(None, None, width, height, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0, bands=bands)
+            try:
+                latency = benchmark_emd(emd, width, height, number=args.number)
+            finally:
+                emd.close()
+            print '{:>12} {:>12} {:>12.3f} {:>10.2f}'.format(size, 'Tiled/%d' % bands, latency * 1e3,
+                                                             baseline / latency)
@@ -0,0 +1,107 @@
+"""
+Benchmark comparing throughput and accuracy of the fixed-point EMD against the float EMD.
+
+The error of the fixed-point EMD is measured against the float EMD fed with the same frames, either recorded frames
+(unwarped to the EMD size) or a synthetic sequence of smoothly changing random frames.
+
+Run from the sw directory:
+
+    python -m benchmarks.fixed_point_benchmark -s 128x32 256x64
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks.emd_benchmark import benchmark_emd
+from benchmarks.frames import load_frames
+from image_processing.motion_detection.EMD import EMD
+from image_processing.motion_detection.FixedPointEMD import FixedPointEMD
+
+
+def synthetic_frames(width, height, n, step=20.0, seed=0):
+    """
+    Creates a sequence of frames whose pixels perform bounded random walks
+
+    :param width: width of the frames
+    :param height: height of the frames
+    :param n: number of frames
+    :param step: standard deviation of the per-frame change of each pixel in gray levels
+    :param seed: seed of the random number generator
+    :return: uint8 array of shape (n, height, width)
+    """
+    rng = np.random.RandomState(seed)
+    img = rng.uniform(0, 255, size=(height, width))
+    frames = np.empty((n, height, width), dtype=np.uint8)
+    for i in range(n):
+        img = np.clip(img + rng.normal(0.0, step, size=(height, width)), 0, 255)
+        frames[i] = img
+    return frames
+
+
+def measure_error(frames, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0, settle=10):
+    """
+    Measures the deviation of the fixed-point EMD from the float EMD
+
+    :param frames: uint8 array of shape (T, height, width)
+    :param settle: number of initial frames excluded while the filters settle
+    :return: max and median absolute nearness map error, max and median absolute COMANV error
+    """
+    height, width = frames.shape[1:]
+    reference = EMD(None, None, width, height, lp_rc, lp_dt, hp_rc, hp_dt)
+    fixed = FixedPointEMD(None, None, width, height, lp_rc, lp_dt, hp_rc, hp_dt)
+
+    nearness_errors = []
+    comanv_errors = []
+    for i, frame in enumerate(frames):
+        expected = reference.update(frame)
+        actual = fixed.update(frame)
+        if i >= settle:
+            nearness_errors.append(np.max(np.abs(actual['nearness_map'] - expected['nearness_map'])))
+            comanv_errors.append(np.max(np.abs(np.subtract(actual['COMANV'], expected['COMANV']))))
+
+    return np.max(nearness_errors), np.median(nearness_errors), np.max(comanv_errors), np.median(comanv_errors)
+
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--sizes',
+                        default=['128x32', '256x64'],
+                        nargs='+',
+                        type=str,
+                        dest='sizes',
+                        help='Specify the EMD sizes as WIDTHxHEIGHT')
+    parser.add_argument('-i', '--input',
+                        default=None,
+                        type=str,
+                        dest='input',
+                        help='Specify recorded frames for measuring the error (synthetic frames by default)')
+    parser.add_argument('-n', '--number',
+                        default=100,
+                        type=int,
+                        dest='number',
+                        help='Specify the number of frames per timing run')
+    args = parser.parse_args()
+
+    recorded = load_frames(args.input, 500) if args.input else None
+
+    print '{:>10} {:>10} {:>10} {:>8} {:>12} {:>12} {:>12} {:>12}'.format(
+        'size', 'float [ms]', 'fixed [ms]', 'speedup', 'map max', 'map median', 'comanv max', 'comanv median')
+    for size in args.sizes:
+        width, height = map(int, size.split('x'))
+
+        float_latency = benchmark_emd(EMD(None, None, width, height, 10.0, 1.0, 5.0, 1.0),
+                                      width, height, number=args.number)
+        fixed_latency = benchmark_emd(FixedPointEMD(None, None, width, height, 10.0, 1.0, 5.0, 1.0),
+                                      width, height, number=args.number)
+
+        if recorded is not None:
+            frames = np.stack([cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA) for frame in recorded])
+        else:
+            frames = synthetic_frames(width, height, 300)
+        errors = measure_error(frames)
+
+        print '{:>10} {:>10.3f} {:>10.3f} {:>8.2f} {:>12.4f} {:>12.4f} {:>12.4f} {:>12.4f}'.format(
+            size, float_latency * 1e3, fixed_latency * 1e3, float_latency / fixed_latency, *errors)
@@ -0,0 +1,52 @@
+"""
+Helpers for loading recorded frames used by the benchmarks
+"""
+
+import glob
+
+import cv2
+import numpy as np
+
+from zmq_socket.MessageLog import MessageLogReader
+from zmq_socket.message import unpack_message
+
+
+def load_frames(path, max_frames=None, key='camera_image'):
+    """
+    Loads a sequence of grayscale frames from a video file, a .npy file holding a (T, H, W) stack or a message log
+    recorded with zmq_socket.Recorder
+
+    :param path: path of the video or .npy file, or base path of the message log
+    :param max_frames: maximum number of frames to load (all frames if None)
+    :param key: key of the frames in the recorded messages (message logs only)
+    :return: uint8 array of shape (T, H, W)
+    """
+    if path.endswith('.npy'):
+        frames = np.load(path, mmap_mode='r')
+        return np.asarray(frames[:max_frames])
+
+    if glob.glob(path + '.*.log'):
+        frames = []
+        for _, message in MessageLogReader(path).messages():
+            data = unpack_message(message)
+            if key in data:
+                frames.append(data[key])
+            if max_frames is not None and len(frames) >= max_frames:
+                break
+        return np.stack(frames)
+
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while max_frames is None or len(frames) < max_frames:
+        success, frame = capture.read()
+        if not success:
+            break
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        frames.append(frame)
+    capture.release()
+
+    if not frames:
+        raise IOError('Could not read any frames from ' + path + '!')
+
+    return np.stack(frames)
@@ -0,0 +1,248 @@
+"""
+End-to-end benchmark of the Unwarper -> EMD -> Publisher pipeline fed by the synthetic camera.
+
+Camera image, remapped image and EMD grow together with the resolution scale: at scale s the camera renders
+s * camera_scale times the calibrated image size and the EMD has s times the base size. The published frames are
+received by a Subscriber, so the reported latencies are capture-to-publish latencies of frames that left the pipeline.
+In 'processes' mode, frames published before the subscriber has connected are lost and not counted as dropped.
+
+In 'fused' mode all stages run in this process (see pipeline.FusedPipeline) and the mean time per stage is reported
+as well. In 'processes' mode every stage runs in its own process connected by queues as in main.py.
+
+Run from the sw directory:
+
+    python -m benchmarks.pipeline_benchmark -c calib_results.txt -m fused processes
+"""
+
+import argparse
+import multiprocessing
+import Queue
+import time
+
+from camera.synthetic.SyntheticCameraClient import Camera
+from image_processing.motion_detection.EMD import EMD
+from image_processing.remapping.OCameraModel import OCameraModel
+from image_processing.remapping.Unwarper import Unwarper
+from ipc.FrameRing import FrameRing
+from ipc.LatestValueChannel import LatestValueChannel
+from pipeline.FusedPipeline import FusedPipeline, STAGES
+from tracing.LatencyStats import LatencyStats
+from tracing.trace import monotonic
+from zmq_socket.Publisher import Publisher
+from zmq_socket.Subscriber import Subscriber
+
+# Pipeline modes
+MODES = ('fused', 'processes')
+
+# Time given to the subscriber to connect before the first frame is published
+CONNECT_DELAY = 0.5
+
+
+def create_stages(calibration_file, width, height, camera_scale, scaling_factor, port, queues=None,
+                  lut_cache_dir=None):
+    """
+    Creates camera, unwarper, EMD and publisher for one resolution
+
+    :param calibration_file: calibration file (from OCamModel toolbox) containing camera calibration data
+    :param width: width of the remapped image/EMD
+    :param height: height of the remapped image/EMD
+    :param camera_scale: size of the camera image relative to the calibrated image size
+    :param scaling_factor: scaling factor of the perspective undistortion
+    :param port: port of the publisher socket
+    :param queues: dict of queues connecting the stages (see main.py), None for the fused pipeline
+    :param lut_cache_dir: directory caching the undistortion LUTs (no caching if None)
+    :return: camera, unwarper, EMD, publisher
+    """
+    queues = queues or {}
+
+    ocammodel = OCameraModel()
+    ocammodel.get_ocam_model(calibration_file)
+
+    camera_width, camera_height = ocammodel.get_image_size()
+    camera = Camera(output_queue=queues.get('unwarper_in'),
+                    width=int(round(camera_width * camera_scale)),
+                    height=int(round(camera_height * camera_scale)))
+    unwarper = Unwarper(input_queue=queues.get('unwarper_in'),
+                        output_queue=queues.get('emd_in'),
+                        width_rescaled=width,
+                        height_rescaled=height,
+                        scaling_factor=scaling_factor,
+                        calibration_file=calibration_file,
+                        input_scale=camera_scale,
+                        lut_cache_dir=lut_cache_dir)
+    emd = EMD(input_queue=queues.get('emd_in'),
+              output_queue=queues.get('zmq_socket_in'),
+              width=width,
+              height=height,
+              lp_rc=10.0, lp_dt=1.0,
+              hp_rc=5.0, hp_dt=1.0)
+    publisher = Publisher(input_queue=queues.get('zmq_socket_in'), port=port)
+
+    return camera, unwarper, emd, publisher
+
+
+def collect(subscriber_queue, stats, frames, timeout=5.0):
+    """
+    Feeds received frames into the latency statistics
+
+    :param subscriber_queue: output queue of the subscriber
+    :param stats: LatencyStats instance
+    :param frames: number of frames to receive (all frames available within the timeout if None)
+    :param timeout: maximum time to wait for a frame in seconds
+    :return: monotonic receive times of the first and last frame
+    """
+    t_first = t_last = None
+    while frames is None or stats.received < frames:
+        try:
+            stats.add(subscriber_queue.get(timeout=timeout))
+        except Queue.Empty:
+            break
+        t_last = monotonic()
+        if t_first is None:
+            t_first = t_last
+    return t_first, t_last
+
+
+def benchmark_pipeline(calibration_file, width, height, camera_scale=0.25, scaling_factor=4.0, mode='fused',
+                       frames=200, port=55556, lut_cache_dir=None):
+    """
+    Measures the throughput and latency of the pipeline at one resolution
+
+    :param calibration_file: calibration file (from OCamModel toolbox) containing camera calibration data
+    :param width: width of the remapped image/EMD
+    :param height: height of the remapped image/EMD
+    :param camera_scale: size of the camera image relative to the calibrated image size
+    :param scaling_factor: scaling factor of the perspective undistortion
+    :param mode: 'fused' or 'processes' (see MODES)
+    :param frames: number of frames to process
+    :param port: port of the publisher socket
+    :param lut_cache_dir: directory caching the undistortion LUTs (no caching if None)
+    :return: frames per second, LatencyStats of the received frames, mean time per stage in seconds (fused mode only)
+    """
+    if mode not in MODES:
+        raise ValueError('Unknown pipeline mode ' + str(mode) + '!')
+
+    stats = LatencyStats()
+    subscriber_queue = multiprocessing.Queue()
+    subscriber = Subscriber(output_queue=subscriber_queue, port=port)
+    subscriber.start()
+
+    tasks = [subscriber]
+    try:
+        if mode == 'fused':
+            camera, unwarper, emd, publisher = create_stages(calibration_file, width, height, camera_scale,
+                                                             scaling_factor, port, lut_cache_dir=lut_cache_dir)
+            pipeline = FusedPipeline(camera, unwarper, emd, publisher, report_interval=0)
+
+            # Bind the socket before the pipeline runs, so the subscriber is connected when the first frame is sent
+            publisher.open()
+            time.sleep(CONNECT_DELAY)
+
+            t_start = monotonic()
+            pipeline.run(max_frames=frames)
+            fps = frames / (monotonic() - t_start)
+
+            collect(subscriber_queue, stats, None, timeout=1.0)
+            return fps, stats, pipeline.timings()
+
+        ocammodel = OCameraModel()
+        ocammodel.get_ocam_model(calibration_file)
+        camera_width, camera_height = ocammodel.get_image_size()
+        queues = {'unwarper_in': FrameRing('camera_image', shape=(int(round(camera_height * camera_scale)),
+                                                                  int(round(camera_width * camera_scale)))),
+                  'emd_in': FrameRing('remapped_image', shape=(height, width)),
+                  'zmq_socket_in': LatestValueChannel()}
+        stages = create_stages(calibration_file, width, height, camera_scale, scaling_factor, port, queues,
+                               lut_cache_dir)
+        for task in reversed(stages):
+            task.start()
+            tasks.append(task)
+
+        # Skip the frames processed while the pipeline starts up
+        collect(subscriber_queue, stats, 10)
+        stats.reset()
+
+        t_first, t_last = collect(subscriber_queue, stats, frames)
+        fps = (stats.received - 1) / (t_last - t_first) if stats.received > 1 else 0.0
+        return fps, stats, None
+    finally:
+        # Stages block on their input queues, so they are killed instead of asking them to exit
+        for task in tasks:
+            multiprocessing.Process.terminate(task)
+            task.join()
+
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--calibration-file',
+                        required=True,
+                        type=str,
+                        dest='calibration_file',
+                        help='Specify the calibration file')
+    parser.add_argument('-s', '--size',
+                        default='128x32',
+                        type=str,
+                        dest='size',
+                        help='Specify the EMD size at scale 1 as WIDTHxHEIGHT')
+    parser.add_argument('-r', '--scales',
+                        default=[1, 2, 4],
+                        nargs='+',
+                        type=int,
+                        dest='scales',
+                        help='Specify the resolution scales')
+    parser.add_argument('--camera-scale',
+                        default=0.25,
+                        type=float,
+                        dest='camera_scale',
+                        help='Specify the camera image size at scale 1 relative to the calibrated image size')
+    parser.add_argument('-f', '--scaling-factor',
+                        default=4.0,
+                        type=float,
+                        dest='scaling_factor',
+                        help='Specify the scaling factor of the perspective undistortion')
+    parser.add_argument('-m', '--modes',
+                        default=['fused'],
+                        nargs='+',
+                        choices=MODES,
+                        dest='modes',
+                        help='Specify the pipeline modes')
+    parser.add_argument('-n', '--frames',
+                        default=200,
+                        type=int,
+                        dest='frames',
+                        help='Specify the number of frames per run')
+    parser.add_argument('-p', '--port',
+                        default=55556,
+                        type=int,
+                        dest='port',
+                        help='Specify the port used by the publisher')
+    parser.add_argument('--lut-cache-dir',
+                        default=None,
+                        type=str,
+                        dest='lut_cache_dir',
+                        help='Specify the directory caching the undistortion LUTs (no caching by default)')
+    args = parser.parse_args()
+
+    base_width, base_height = map(int, args.size.split('x'))
+
+    print '{:>6} {:>10} {:>10} {:>8} {:>8} {:>12} {:>12}'.format(
+        'scale', 'emd size', 'mode', 'fps', 'dropped', 'p50 [ms]', 'p99 [ms]') + \
+        ''.join('{:>13}'.format(stage + ' [ms]') for stage in STAGES)
+    for scale in args.scales:
+        width, height = base_width * scale, base_height * scale
+        for mode in args.modes:
+            fps, stats, timings = benchmark_pipeline(args.calibration_file, width, height,
+                                                     camera_scale=args.camera_scale * scale,
+                                                     scaling_factor=args.scaling_factor,
+                                                     mode=mode,
+                                                     frames=args.frames,
+                                                     port=args.port,
+                                                     lut_cache_dir=args.lut_cache_dir)
+            latency = stats.percentiles((50, 99)).get('publisher', {}).get('latency') or [float('nan')] * 2
+            line = '{:>6} {:>10} {:>10} {:>8.1f} {:>8} {:>12.2f} {:>12.2f}'.format(
+                '%dx' % scale, '%dx%d' % (width, height), mode, fps, stats.dropped, latency[0] * 1e3,
+                latency[1] * 1e3)
+            if timings is not None:
+                line += ''.join('{:>13.2f}'.format(timings[stage] * 1e3) for stage in STAGES)
+            print line
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark comparing the per-frame remap latency of the Unwarper for float and fixed-point LUTs and the
+supported interpolation modes.
+
+Run from the sw directory:
+
+    python -m benchmarks.remap_benchmark -c calib_results.txt -s 320x240 640x480
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from image_processing.remapping.OCameraModel import OCameraModel
+from image_processing.remapping.Unwarper import Unwarper, INTERPOLATION_MODES
+
+
+def benchmark_remap(calibration_file, width, height, scaling_factor, interpolation, fixed_point_maps,
+                    repeat=5, number=100, lut_cache_dir=None):
+    """
+    Measures the per-frame remap latency of an Unwarper configuration
+
+    :param calibration_file: calibration file (from OCamModel toolbox) containing camera calibration data
+    :param width: width of the remapped image
+    :param height: height of the remapped image
+    :param scaling_factor: scaling factor of the perspective undistortion
+    :param interpolation: interpolation used for remapping ('nearest' or 'linear')
+    :param fixed_point_maps: uses fixed-point LUTs if set to true
+    :param repeat: number of timing runs
+    :param number: number of frames remapped per timing run
+    :param lut_cache_dir: directory caching the undistortion LUTs (no caching if None)
+    :return: best per-frame latency in seconds
+    """
+    # Create random input image with the size of the calibrated camera image
+    ocammodel = OCameraModel()
+    ocammodel.get_ocam_model(calibration_file)
+    camera_width, camera_height = ocammodel.get_image_size()
+    img = np.random.randint(0, 256, size=(camera_height, camera_width)).astype(np.uint8)
+
+    unwarper = Unwarper(input_queue=None,
+                        output_queue=None,
+                        width_rescaled=width,
+                        height_rescaled=height,
+                        scaling_factor=scaling_factor,
+                        calibration_file=calibration_file,
+                        interpolation=interpolation,
+                        fixed_point_maps=fixed_point_maps,
+                        lut_cache_dir=lut_cache_dir)
+
+    timings = timeit.repeat(lambda: unwarper.remap(img), repeat=repeat, number=number)
+    return min(timings) / number
+
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--calibration-file',
+                        required=True,
+                        type=str,
+                        dest='calibration_file',
+                        help='Specify the calibration file')
+    parser.add_argument('-s', '--sizes',
+                        default=['320x240', '640x480'],
+                        nargs='+',
+                        type=str,
+                        dest='sizes',
+                        help='Specify the output sizes as WIDTHxHEIGHT')
+    parser.add_argument('-f', '--scaling-factor',
+                        default=4.0,
+                        type=float,
+                        dest='scaling_factor',
+                        help='Specify the scaling factor of the perspective undistortion')
+    parser.add_argument('-n', '--number',
+                        default=100,
+                        type=int,
+                        dest='number',
+                        help='Specify the number of frames per timing run')
+    parser.add_argument('--lut-cache-dir',
+                        default=None,
+                        type=str,
+                        dest='lut_cache_dir',
+                        help='Specify the directory caching the undistortion LUTs (no caching by default)')
+    args = parser.parse_args()
+
+    print '{:>12} {:>12} {:>12} {:>12}'.format('size', 'interp', 'maps', 'ms/frame')
+    for size in args.sizes:
+        width, height = map(int, size.split('x'))
+        for interpolation in sorted(INTERPOLATION_MODES):
+            for fixed_point_maps in (False, True):
+                latency = benchmark_remap(args.calibration_file, width, height, args.scaling_factor,
+                                          interpolation, fixed_point_maps, number=args.number,
+                                          lut_cache_dir=args.lut_cache_dir)
+                print '{:>12} {:>12} {:>12} {:>12.3f}'.format(size, interpolation,
+                                                              'fixed' if fixed_point_maps else 'float',
+                                                              latency * 1e3)
@@ -0,0 +1,269 @@
+"""
+Benchmark suite measuring the hot paths of the pipeline over a matrix of resolutions and comparing the results against
+a stored baseline.
+
+The suite measures per size (WIDTHxHEIGHT of the remapped image/EMD):
+
+    lut_build      OCameraModel perspective undistortion LUT build
+    remap          Unwarper remap of a camera image
+    emd_update     EMD update
+    serialize      Publisher message packing of a nearness map
+    deserialize    Subscriber message unpacking of a nearness map
+    pipeline       time per frame of the fused pipeline fed by the synthetic camera
+
+All results are seconds (lower is better) and are written to a JSON file together with a description of the
+environment. Baselines are only comparable on the host (and load) they were measured on, so a baseline is stored per
+target by running the suite on it.
+
+Run from the sw directory:
+
+    python -m benchmarks.suite run -c calib_results.txt -o baseline.json
+    python -m benchmarks.suite run -c calib_results.txt -o results.json
+    python -m benchmarks.suite compare baseline.json results.json -t 0.1
+
+compare exits with status 1 if any result regressed by more than the threshold.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import cv2
+import numpy as np
+
+from benchmarks.codec_benchmark import benchmark_codec
+from benchmarks.emd_benchmark import benchmark_emd
+from benchmarks.pipeline_benchmark import benchmark_pipeline
+from benchmarks.remap_benchmark import benchmark_remap
+from image_processing.motion_detection.EMD import EMD
+from image_processing.remapping.OCameraModel import OCameraModel
+
+# Benchmarks in the order they are run
+BENCHMARKS = ('lut_build', 'remap', 'emd_update', 'serialize', 'deserialize', 'pipeline')
+
+
+def benchmark_lut_build(calibration_file, width, height, scaling_factor, repeat=3, number=5):
+    """
+    Measures the build time of the perspective undistortion LUTs
+
+    :param calibration_file: calibration file (from OCamModel toolbox) containing camera calibration data
+    :param width: width of the remapped image
+    :param height: height of the remapped image
+    :param scaling_factor: scaling factor of the perspective undistortion
+    :param repeat: number of timing runs
+    :param number: number of builds per timing run
+    :return: best build time in seconds
+    """
+    ocammodel = OCameraModel()
+    ocammodel.get_ocam_model(calibration_file)
+
+    timings = timeit.repeat(lambda: ocammodel.create_perspective_undistortion_lut(height, width, scaling_factor),
+                            repeat=repeat, number=number)
+    return min(timings) / number
+
+
+def run_suite(calibration_file, sizes, scaling_factor=4.0, camera_scale=0.5, benchmarks=BENCHMARKS, number=50,
+              port=55556, lut_cache_dir=None):
+    """
+    Runs the selected benchmarks for all sizes
+
+    :param calibration_file: calibration file (from OCamModel toolbox) containing camera calibration data
+    :param sizes: sizes of the remapped image/EMD as WIDTHxHEIGHT strings
+    :param scaling_factor: scaling factor of the perspective undistortion
+    :param camera_scale: size of the synthetic camera image relative to the calibrated image size (pipeline only)
+    :param benchmarks: names of the benchmarks to run (see BENCHMARKS)
+    :param number: number of frames per timing run
+    :param port: port of the publisher socket (pipeline only)
+    :param lut_cache_dir: directory caching the undistortion LUTs of remap and pipeline (no caching if None)
+    :return: dict mapping benchmark names to dicts mapping sizes to seconds
+    """
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError('Unknown benchmarks ' + ', '.join(sorted(unknown)) + '!')
+
+    results = dict((name, {}) for name in benchmarks)
+    for size in sizes:
+        width, height = map(int, size.split('x'))
+
+        if 'lut_build' in results:
+            results['lut_build'][size] = benchmark_lut_build(calibration_file, width, height, scaling_factor)
+
+        if 'remap' in results:
+            results['remap'][size] = benchmark_remap(calibration_file, width, height, scaling_factor,
+                                                     'linear', False, number=number, lut_cache_dir=lut_cache_dir)
+
+        if 'emd_update' in results:
+            emd = EMD(None, None, width, height, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0)
+            results['emd_update'][size] = benchmark_emd(emd, width, height, number=number)
+
+        if 'serialize' in results or 'deserialize' in results:
+            nearness_maps = np.random.uniform(0, 10, size=(number, height, width)).astype(np.float32)
+            encode_time, decode_time, _ = benchmark_codec(nearness_maps, 'none', key='nearness_map')
+            if 'serialize' in results:
+                results['serialize'][size] = encode_time
+            if 'deserialize' in results:
+                results['deserialize'][size] = decode_time
+
+        if 'pipeline' in results:
+            fps, _, _ = benchmark_pipeline(calibration_file, width, height, camera_scale=camera_scale,
+                                           scaling_factor=scaling_factor, mode='fused', frames=4 * number,
+                                           port=port, lut_cache_dir=lut_cache_dir)
+            results['pipeline'][size] = 1.0 / fps
+
+    return results
+
+
+def environment():
+    """
+    :return: dict describing the host and library versions the results were measured with
+    """
+    return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host': platform.node(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__}
+
+
+def compare(baseline, results, threshold=0.1):
+    """
+    Compares results against a baseline
+
+    :param baseline: results dict of the baseline (see run_suite)
+    :param results: results dict to compare
+    :param threshold: relative slowdown beyond which a result counts as a regression (e.g. 0.1 for 10 %)
+    :return: list of (benchmark, size, baseline seconds, seconds, ratio, status) with status 'regression',
+             'improvement', 'ok' or 'missing' (only present in the baseline)
+    """
+    rows = []
+    for name in sorted(baseline, key=lambda n: BENCHMARKS.index(n) if n in BENCHMARKS else len(BENCHMARKS)):
+        for size in sorted(baseline[name], key=lambda s: map(int, s.split('x'))):
+            expected = baseline[name][size]
+            actual = results.get(name, {}).get(size)
+            if actual is None:
+                rows.append((name, size, expected, None, None, 'missing'))
+                continue
+
+            ratio = actual / expected
+            if ratio > 1.0 + threshold:
+                status = 'regression'
+            elif ratio < 1.0 - threshold:
+                status = 'improvement'
+            else:
+                status = 'ok'
+            rows.append((name, size, expected, actual, ratio, status))
+    return rows
+
+
+if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command')
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and write the results')
+    run_parser.add_argument('-c', '--calibration-file',
+                            required=True,
+                            type=str,
+                            dest='calibration_file',
+                            help='Specify the calibration file')
+    run_parser.add_argument('-s', '--sizes',
+                            default=['128x32', '256x64', '512x128'],
+                            nargs='+',
+                            type=str,
+                            dest='sizes',
+                            help='Specify the remapped image/EMD sizes as WIDTHxHEIGHT')
+    run_parser.add_argument('-b', '--benchmarks',
+                            default=list(BENCHMARKS),
+                            nargs='+',
+                            choices=BENCHMARKS,
+                            dest='benchmarks',
+                            help='Specify the benchmarks to run')
+    run_parser.add_argument('-f', '--scaling-factor',
+                            default=4.0,
+                            type=float,
+                            dest='scaling_factor',
+                            help='Specify the scaling factor of the perspective undistortion')
+    run_parser.add_argument('--camera-scale',
+                            default=0.5,
+                            type=float,
+                            dest='camera_scale',
+                            help='Specify the synthetic camera image size relative to the calibrated image size')
+    run_parser.add_argument('-n', '--number',
+                            default=50,
+                            type=int,
+                            dest='number',
+                            help='Specify the number of frames per timing run')
+    run_parser.add_argument('-o', '--output',
+                            default='benchmark_results.json',
+                            type=str,
+                            dest='output',
+                            help='Specify the JSON file the results are written to')
+    run_parser.add_argument('--lut-cache-dir',
+                            default=None,
+                            type=str,
+                            dest='lut_cache_dir',
+                            help='Specify the directory caching the undistortion LUTs (no caching by default)')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare results against a baseline')
+    compare_parser.add_argument('baseline',
+                                type=str,
+                                help='Specify the JSON file holding the baseline')
+    compare_parser.add_argument('results',
+                                type=str,
+                                help='Specify the JSON file holding the results to compare')
+    compare_parser.add_argument('-t', '--threshold',
+                                default=0.1,
+                                type=float,
+                                dest='threshold',
+                                help='Specify the relative slowdown counted as a regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        results = run_suite(args.calibration_file, args.sizes, scaling_factor=args.scaling_factor,
+                            camera_scale=args.camera_scale, benchmarks=args.benchmarks, number=args.number,
+                            lut_cache_dir=args.lut_cache_dir)
+
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(),
+                       'settings': {'calibration_file': args.calibration_file,
+                                    'scaling_factor': args.scaling_factor,
+                                    'camera_scale': args.camera_scale,
+                                    'number': args.number},
+                       'results': results}, f, indent=2, sort_keys=True)
+
+        print '{:>12} {:>10} {:>12}'.format('benchmark', 'size', 'ms')
+        for name in args.benchmarks:
+            for size in args.sizes:
+                print '{:>12} {:>10} {:>12.3f}'.format(name, size, results[name][size] * 1e3)
+        print 'Results written to ' + args.output
+
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.results) as f:
+            current = json.load(f)
+
+        if baseline['environment'].get('host') != current['environment'].get('host'):
+            print 'Warning: baseline was measured on host %s, results on host %s' % (
+                baseline['environment'].get('host'), current['environment'].get('host'))
+
+        rows = compare(baseline['results'], current['results'], args.threshold)
+
+        print '{:>12} {:>10} {:>14} {:>12} {:>8} {:>12}'.format('benchmark', 'size', 'baseline [ms]', 'ms', 'ratio',
+                                                                'status')
+        for name, size, expected, actual, ratio, status in rows:
+            if actual is None:
+                print '{:>12} {:>10} {:>14.3f} {:>12} {:>8} {:>12}'.format(name, size, expected * 1e3, '-', '-',
+                                                                         status)
+            else:
+                print '{:>12} {:>10} {:>14.3f} {:>12.3f} {:>8.2f} {:>12}'.format(name, size, expected * 1e3,
+                                                                               actual * 1e3, ratio, status)
+
+        regressions = [row for row in rows if row[5] == 'regression']
+        if regressions:
+            print '%d regression(s) beyond %.0f %%' % (len(regressions), args.threshold * 100)
+            sys.exit(1)
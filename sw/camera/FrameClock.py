@@ -0,0 +1,39 @@
+"""
+Implements pacing of camera sources that are not paced by a device
+"""
+
+import time
+
+from tracing.trace import monotonic
+
+
+class FrameClock(object):
+    """
+    This class paces a frame source to a fixed frame rate. Frame times are scheduled on a fixed grid, so the rate does
+    not drift with the processing time per frame. If the source falls behind by more than a frame, the grid is
+    restarted instead of delivering the missed frames in a burst.
+    """
+
+    def __init__(self, fps=None):
+        """
+        Constructor of the FrameClock class
+
+        :param fps: frame rate (unthrottled if None or 0)
+        """
+        self._interval = 1.0 / fps if fps else 0.0
+        self._next = None
+
+    def wait(self):
+        """
+        Waits until the next frame is due
+        """
+        if not self._interval:
+            return
+
+        now = monotonic()
+        if self._next is None or now - self._next > self._interval:
+            self._next = now
+        elif self._next > now:
+            time.sleep(self._next - now)
+
+        self._next += self._interval
@@ -0,0 +1,178 @@
+"""
+A client for getting images from a video file or an image directory.
+"""
+
+import glob
+import multiprocessing
+import os
+import cv2
+import numpy as np
+
+from camera.FrameClock import FrameClock
+from tracing.trace import add_span, monotonic, start_trace
+
+# File extensions read from image directories
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.pgm', '.tif', '.tiff')
+
+
+class Camera(multiprocessing.Process):
+    """
+    Implements a task for playing back a video file or a directory of images (in sorted order) as camera images, at a
+    fixed frame rate or as fast as the pipeline consumes them.
+    """
+
+    def __init__(self, output_queue,
+                 path,
+                 fps=None,
+                 loop=True,
+                 roi_horizontal=None,
+                 roi_vertical=None):
+        """
+        Constructor for the Camera class.
+
+        :param output_queue: multiprocessing.Queue containing output data
+        :param path: path of a video file or of a directory containing images
+        :param fps: frame rate of the playback (unthrottled if None or 0)
+        :param loop: restarts the playback at the end if set to true, otherwise None is put into the output queue
+        :param roi_horizontal: horizontal region-of-interest (first, last column)
+        :param roi_vertical: vertical region-of-interest (first, last row)
+        """
+
+        # Initialize multiprocessing.Process parent
+        multiprocessing.Process.__init__(self)
+
+        # Establish queue
+        self._output_queue = output_queue
+
+        # Exit event for stopping the process
+        self._exit = multiprocessing.Event()
+
+        # Initialize variables
+        self._path = path
+        self._fps = fps
+        self._loop = loop
+        self._roi_horizontal = roi_horizontal
+        self._roi_vertical = roi_vertical
+
+        # Sequence number of the next frame
+        self._frame_id = 0
+
+        # Source is set up by open
+        self._capture = None
+        self._images = None
+        self._index = 0
+        self._clock = None
+
+    def run(self):
+        """
+        Function called when task is started (e.g. task.start()). Overrides run function of multiprocessing. Process
+        parent
+        """
+
+        # Clear exit event just to be sure
+        self._exit.clear()
+
+        # Setup the source
+        self.open()
+
+        # While exit event is not set...
+        while not self._exit.is_set():
+            # ...put image into output queue
+            data = self.grab()
+            self._output_queue.put(data)
+            if data is None:
+                break
+
+        # ...shutdown
+        self.close()
+
+    def open(self):
+        """
+        Sets up the source. Called by run, only needs to be called directly if the camera is used without starting
+        the process.
+        """
+        if os.path.isdir(self._path):
+            self._images = sorted(f for f in glob.glob(os.path.join(self._path, '*'))
+                                  if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS)
+            if not self._images:
+                raise IOError('No images found in ' + self._path + '!')
+        else:
+            self._capture = cv2.VideoCapture(self._path)
+            if not self._capture.isOpened():
+                raise IOError('Could not open ' + self._path + '!')
+
+        self._index = 0
+        self._clock = FrameClock(self._fps)
+
+    def grab(self):
+        """
+        Reads the next image of the source
+
+        :return: dict containing the camera image, or None at the end of the source if not looping
+        """
+        self._clock.wait()
+        t_enter = monotonic()
+
+        img = self._read()
+        if img is None and self._loop:
+            self._rewind()
+            img = self._read()
+        if img is None:
+            return None
+
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        # Apply ROIs if specified
+        if self._roi_vertical:
+            img = img[self._roi_vertical[0]:self._roi_vertical[1],
+                      :]
+
+        if self._roi_horizontal:
+            img = img[:,
+                      self._roi_horizontal[0]:self._roi_horizontal[1]]
+
+        data = {'camera_image': np.ascontiguousarray(img)}
+        start_trace(data, self._frame_id)
+        add_span(data, 'camera', t_enter)
+        self._frame_id += 1
+
+        return data
+
+    def close(self):
+        """
+        Releases the source
+        """
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    def terminate(self):
+        """
+        Called when task is terminated. Overwrites multiprocessing.Process.terminate() function
+        """
+        # Set exit event
+        self._exit.set()
+
+    def _read(self):
+        """
+        :return: next image of the source or None at its end
+        """
+        if self._images is not None:
+            if self._index >= len(self._images):
+                return None
+            img = cv2.imread(self._images[self._index], cv2.IMREAD_UNCHANGED)
+            self._index += 1
+            return img
+
+        s, img = self._capture.read()
+        return img if s else None
+
+    def _rewind(self):
+        """
+        Restarts the source at its first image
+        """
+        if self._images is not None:
+            self._index = 0
+        else:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
@@ -8,6 +8,41 @@ import numpy as np
 import picamera
 from picamera.array import PiRGBArray
 
+from tracing.trace import add_span, monotonic, start_trace
+
+# Capture modes: continuous capture of the luminance plane through the video port or single RGB stills
+CAPTURE_MODES = ('video', 'still')
+
+
+class _FrameBuffer(object):
+    """
+    File-like object receiving the frames written by picamera into a reused buffer
+    """
+
+    def __init__(self, size):
+        self.buffer = bytearray(size)
+        self._position = 0
+
+    def write(self, data):
+        end = self._position + len(data)
+        # The buffer is exported to numpy and cannot grow, so frames larger than the buffer are rejected
+        if end > len(self.buffer):
+            raise IOError('Frame of at least ' + str(end) + ' bytes does not fit into the frame buffer of ' +
+                          str(len(self.buffer)) + ' bytes!')
+        self.buffer[self._position:end] = data
+        self._position = end
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def seek(self, position):
+        self._position = position
+
+    def truncate(self, size=None):
+        pass
+
+
 class Camera(multiprocessing.Process):
     """
     Implements a task for fetching camera images from a Raspberry Pi camera.
@@ -17,12 +52,24 @@ class Camera(multiprocessing.Process):
                  resolution=(1024,768),
                  framerate=32,
                  roi_horizontal=None,
-                 roi_vertical=None):
+                 roi_vertical=None,
+                 capture_mode='video',
+                 resize=None):
         """
         Constructor for the Camera class.
 
         :param output_queue: multiprocessing.Queue containing output data
+        :param resolution: sensor resolution (width, height)
+        :param framerate: frame rate of the camera
+        :param roi_horizontal: horizontal region-of-interest (first, last column) of the delivered image
+        :param roi_vertical: vertical region-of-interest (first, last row) of the delivered image
+        :param capture_mode: 'video' captures continuously through the video port in YUV format and only uses the
+                             luminance plane, 'still' captures single RGB images through the still port
+        :param resize: size (width, height) the GPU resizes the images to in video mode, e.g. the input size the
+                       Unwarper is configured for (see its input_scale); full resolution if None
         """
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError('Unknown capture mode ' + str(capture_mode) + '!')
 
         # Initialize multiprocessing.Process parent
         multiprocessing.Process.__init__(self)
@@ -38,7 +85,18 @@ class Camera(multiprocessing.Process):
         self._framerate = framerate
         self._roi_horizontal = roi_horizontal
         self._roi_vertical = roi_vertical
+        self._capture_mode = capture_mode
+        self._resize = resize
+
+        # Sequence number of the next frame
+        self._frame_id = 0
 
+        # Camera is set up by open
+        self._camera = None
+        self._raw_capture = None
+        self._frame_buffer = None
+        self._stream = None
+        self._luminance = None
 
     def run(self):
         """
@@ -50,37 +108,94 @@ class Camera(multiprocessing.Process):
         self._exit.clear()
 
         # Setup the camera
-        camera = picamera.PiCamera()
-        camera.resolution = self._resolution
-        camera.framerate = self._framerate
-        rawCapture = PiRGBArray(camera, size=self._resolution)
-
+        self.open()
 
         # While exit event is not set...
         while not self._exit.is_set():
-            camera.capture(rawCapture, format='rgb')
-            buf = rawCapture.array
-            rawCapture.truncate(0)
-            img = cv2.cvtColor(buf, cv2.COLOR_RGB2GRAY)
-
-            # ...apply ROIs if specified
-            if self._roi_vertical:
-                img = img[self._roi_vertical[0]:self._roi_vertical[1],
-                          :]
-
-            if self._roi_horizontal:
-                img = img[:,
-                          self._roi_horizontal[0]:self._roi_horizontal[1]]
-
             # ...put image into output queue
-            data = ({'camera_image': img})
-            self._output_queue.put(data)
+            self._output_queue.put(self.grab())
 
         # If exit event set...
         if self._exit.is_set():
             # ...shutdown
             self._output_queue.task_done()
-            camera.close()
+            self.close()
+
+    def open(self):
+        """
+        Sets up the camera. Called by run, only needs to be called directly if the camera is used without starting
+        the process.
+        """
+        self._camera = picamera.PiCamera()
+        self._camera.resolution = self._resolution
+        self._camera.framerate = self._framerate
+
+        if self._capture_mode == 'video':
+            # YUV420 frames are padded to a width of a multiple of 32 and a height of a multiple of 16
+            width, height = self._resize or self._resolution
+            padded_width = (width + 31) // 32 * 32
+            padded_height = (height + 15) // 16 * 16
+
+            # Frames are written into a reused buffer, the luminance plane is its first padded_width * padded_height
+            # bytes
+            self._frame_buffer = _FrameBuffer(padded_width * padded_height * 3 // 2)
+            self._luminance = np.frombuffer(self._frame_buffer.buffer, dtype=np.uint8,
+                                            count=padded_width * padded_height).reshape(padded_height,
+                                                                                        padded_width)[:height, :width]
+            self._stream = self._camera.capture_continuous(self._frame_buffer,
+                                                           format='yuv',
+                                                           use_video_port=True,
+                                                           resize=self._resize)
+        else:
+            self._raw_capture = PiRGBArray(self._camera, size=self._resolution)
+
+    def grab(self):
+        """
+        Grabs an image from the camera
+
+        :return: dict containing the camera image
+        """
+        t_enter = monotonic()
+
+        if self._capture_mode == 'video':
+            # Capture next frame into the buffer, the luminance plane is the grayscale image
+            self._frame_buffer.seek(0)
+            next(self._stream)
+            img = self._luminance
+        else:
+            self._camera.capture(self._raw_capture, format='rgb')
+            buf = self._raw_capture.array
+            self._raw_capture.truncate(0)
+            img = cv2.cvtColor(buf, cv2.COLOR_RGB2GRAY)
+
+        # Apply ROIs if specified
+        if self._roi_vertical:
+            img = img[self._roi_vertical[0]:self._roi_vertical[1],
+                      :]
+
+        if self._roi_horizontal:
+            img = img[:,
+                      self._roi_horizontal[0]:self._roi_horizontal[1]]
+
+        # Copy the region of interest out of the reused buffer, which is overwritten by the next capture
+        if self._capture_mode == 'video':
+            img = img.copy()
+
+        data = {'camera_image': img}
+        start_trace(data, self._frame_id)
+        add_span(data, 'camera', t_enter)
+        self._frame_id += 1
+
+        return data
+
+    def close(self):
+        """
+        Closes the camera
+        """
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._camera.close()
 
     def terminate(self):
         """
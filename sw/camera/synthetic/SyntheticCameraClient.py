@@ -0,0 +1,149 @@
+"""
+A client rendering procedural moving textures as camera images.
+"""
+
+import multiprocessing
+import cv2
+import numpy as np
+
+from camera.FrameClock import FrameClock
+from tracing.trace import add_span, monotonic, start_trace
+
+
+def periodic_texture(width, height, scale=8.0, seed=0):
+    """
+    Creates a random texture that wraps around seamlessly at its borders by low-pass filtering white noise in the
+    frequency domain
+
+    :param width: width of the texture
+    :param height: height of the texture
+    :param scale: spatial scale (standard deviation of the Gaussian filter) of the texture in pixels
+    :param seed: seed of the random number generator
+    :return: float32 array of shape (height, width) with values in [0, 255]
+    """
+    rng = np.random.RandomState(seed)
+    noise = rng.normal(size=(height, width))
+
+    # Gaussian low-pass in the frequency domain keeps the texture periodic
+    fy = np.fft.fftfreq(height)[:, np.newaxis]
+    fx = np.fft.rfftfreq(width)[np.newaxis, :]
+    gain = np.exp(-2.0 * (np.pi * scale) ** 2 * (fx ** 2 + fy ** 2))
+    texture = np.fft.irfft2(np.fft.rfft2(noise) * gain, s=(height, width))
+
+    # Stretch to the full gray value range
+    texture -= texture.min()
+    texture *= 255.0 / texture.max()
+    return texture.astype(np.float32)
+
+
+class Camera(multiprocessing.Process):
+    """
+    Implements a task rendering a random texture that moves with a constant, known optic flow at any resolution. The
+    texture wraps around at the image borders and is shifted with subpixel accuracy, so the sequence is reproducible
+    and free of camera noise.
+    """
+
+    def __init__(self, output_queue,
+                 width=640,
+                 height=480,
+                 flow=(1.0, 0.0),
+                 scale=8.0,
+                 fps=None,
+                 seed=0):
+        """
+        Constructor for the Camera class.
+
+        :param output_queue: multiprocessing.Queue containing output data
+        :param width: width of the rendered images
+        :param height: height of the rendered images
+        :param flow: optic flow (vx, vy) of the texture in pixels per frame
+        :param scale: spatial scale of the texture in pixels
+        :param fps: frame rate of the rendered images (unthrottled if None or 0)
+        :param seed: seed of the random texture
+        """
+
+        # Initialize multiprocessing.Process parent
+        multiprocessing.Process.__init__(self)
+
+        # Establish queue
+        self._output_queue = output_queue
+
+        # Exit event for stopping the process
+        self._exit = multiprocessing.Event()
+
+        # Initialize variables
+        self._width = width
+        self._height = height
+        self._flow = (float(flow[0]), float(flow[1]))
+        self._fps = fps
+
+        # Texture is rendered once, frames are shifted copies
+        self._texture = periodic_texture(width, height, scale, seed)
+
+        # Sequence number of the next frame
+        self._frame_id = 0
+        self._clock = None
+
+    def run(self):
+        """
+        Function called when task is started (e.g. task.start()). Overrides run function of multiprocessing. Process
+        parent
+        """
+
+        # Clear exit event just to be sure
+        self._exit.clear()
+
+        # Setup the clock
+        self.open()
+
+        # While exit event is not set...
+        while not self._exit.is_set():
+            # ...put image into output queue
+            self._output_queue.put(self.grab())
+
+        # ...shutdown
+        self.close()
+
+    def open(self):
+        """
+        Sets up the frame clock. Called by run, only needs to be called directly if the camera is used without
+        starting the process.
+        """
+        self._frame_id = 0
+        self._clock = FrameClock(self._fps)
+
+    def grab(self):
+        """
+        Renders the next image
+
+        :return: dict containing the camera image and the optic flow between consecutive images
+        """
+        self._clock.wait()
+        t_enter = monotonic()
+
+        # Shift the texture by the accumulated flow, wrapping around at the borders
+        shift = np.float32([[1, 0, (self._flow[0] * self._frame_id) % self._width],
+                            [0, 1, (self._flow[1] * self._frame_id) % self._height]])
+        img = cv2.warpAffine(self._texture, shift, (self._width, self._height),
+                             flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_WRAP)
+
+        data = {'camera_image': img.astype(np.uint8),
+                'optic_flow': self._flow}
+        start_trace(data, self._frame_id)
+        add_span(data, 'camera', t_enter)
+        self._frame_id += 1
+
+        return data
+
+    def close(self):
+        """
+        Nothing to release, provided for the common camera interface
+        """
+        pass
+
+    def terminate(self):
+        """
+        Called when task is terminated. Overwrites multiprocessing.Process.terminate() function
+        """
+        # Set exit event
+        self._exit.set()
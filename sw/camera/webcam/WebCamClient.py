@@ -3,23 +3,52 @@ A client for getting images from a webcam.
 """
 
 import multiprocessing
+import threading
+import time
 import cv2
 import numpy as np
 
+from tracing.trace import add_span, monotonic, start_trace
+
+# Time to wait before retrying after a failed grab in seconds
+RETRY_INTERVAL = 0.01
+
+# Interval in seconds in which a waiting grab checks the state of the capture thread (an untimed wait would also
+# block KeyboardInterrupt in Python 2)
+WAIT_INTERVAL = 0.1
+
 
 class Camera(multiprocessing.Process):
     """
     Implements a task for fetching camera images from a webcam.
+
+    Frames are grabbed by a background thread as fast as the device delivers them. Only the newest frame is kept, so
+    grab always returns the most recent frame. Each frame is stamped with its sequence number (frame_id) and its
+    capture time (t_capture). Frames replaced before they were returned by grab are counted as dropped, grabs failing
+    on the device are counted as failed. grab raises an IOError if no frame arrives within grab_timeout (e.g. because
+    the device was disconnected) or if the capture thread failed, and returns None after close was called.
     """
 
     def __init__(self, output_queue,
                  camera_port=0,
                  roi_horizontal=None,
-                 roi_vertical=None):
+                 roi_vertical=None,
+                 resolution=None,
+                 fps=None,
+                 fourcc=None,
+                 grab_timeout=5.0):
         """
         Constructor for the Camera class.
 
         :param output_queue: multiprocessing.Queue containing output data
+        :param camera_port: camera port index
+        :param roi_horizontal: horizontal region-of-interest (first, last column)
+        :param roi_vertical: vertical region-of-interest (first, last row)
+        :param resolution: resolution (width, height) requested from the device (device default if None)
+        :param fps: frame rate requested from the device (device default if None)
+        :param fourcc: four character code of the pixel format requested from the device, e.g. 'MJPG' (device default
+                       if None)
+        :param grab_timeout: maximum time in seconds grab waits for a new frame (no limit if None)
         """
 
         # Initialize multiprocessing.Process parent
@@ -38,6 +67,27 @@ class Camera(multiprocessing.Process):
         self._roi_horizontal = roi_horizontal
         self._roi_vertical = roi_vertical
 
+        # Get device settings
+        self._resolution = resolution
+        self._fps = fps
+        self._fourcc = fourcc
+        self._grab_timeout = grab_timeout
+
+        # Counts of dropped frames and failed grabs, readable from other processes
+        self._dropped = multiprocessing.Value('L', 0)
+        self._failed_grabs = multiprocessing.Value('L', 0)
+
+        # Camera and capture thread are set up by open
+        self._camera = None
+        self._capture_thread = None
+        self._stop_capture = threading.Event()
+
+        # Newest frame (image, sequence number, capture time), guarded by the condition
+        self._frame_available = threading.Condition()
+        self._latest = None
+
+        # Exception that stopped the capture thread
+        self._capture_error = None
 
     def run(self):
         """
@@ -49,31 +99,166 @@ class Camera(multiprocessing.Process):
         self._exit.clear()
 
         # Setup the camera
-        camera = cv2.VideoCapture(self._camera_port)
+        self.open()
 
         # While exit event is not set...
         while not self._exit.is_set():
-            s, buf = camera.read()
-            img = cv2.cvtColor(buf, cv2.COLOR_RGB2GRAY)
-
-            # ...apply ROIs if specified
-            if self._roi_vertical:
-                img = img[self._roi_vertical[0]:self._roi_vertical[1],
-                          :]
-
-            if self._roi_horizontal:
-                img = img[:,
-                          self._roi_horizontal[0]:self._roi_horizontal[1]]
-
             # ...put image into output queue
-            data = ({'camera_image': img})
+            data = self.grab()
             self._output_queue.put(data)
+            if data is None:
+                break
 
         # If exit event set...
         if self._exit.is_set():
             # ...shutdown
             self._output_queue.task_done()
-            camera.close()
+            self.close()
+
+    def open(self):
+        """
+        Sets up the camera. Called by run, only needs to be called directly if the camera is used without starting
+        the process.
+
+        :raises IOError: if the device does not deliver the requested resolution
+        """
+        self._camera = cv2.VideoCapture(self._camera_port)
+
+        # Configure device so that no bandwidth is spent on unused pixels
+        if self._fourcc:
+            self._camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self._fourcc))
+        if self._resolution:
+            self._camera.set(cv2.CAP_PROP_FRAME_WIDTH, self._resolution[0])
+            self._camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self._resolution[1])
+        if self._fps:
+            self._camera.set(cv2.CAP_PROP_FPS, self._fps)
+
+        # Devices may ignore the requested resolution, the frames would then not fit into the frame ring
+        if self._resolution:
+            resolution = (int(self._camera.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                          int(self._camera.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            if resolution != tuple(self._resolution):
+                self._camera.release()
+                raise IOError('Camera port ' + str(self._camera_port) + ' delivers ' + '%dx%d' % resolution +
+                              ' instead of the requested resolution ' + '%dx%d' % tuple(self._resolution) + '!')
+
+        # Start grabbing frames in the background
+        self._stop_capture.clear()
+        self._capture_error = None
+        self._capture_thread = threading.Thread(target=self._capture)
+        self._capture_thread.daemon = True
+        self._capture_thread.start()
+
+    def grab(self):
+        """
+        Returns the newest frame of the camera, waiting for a frame that was not returned before
+
+        :return: dict containing the camera image and its capture time, or None if the camera was closed
+        :raises IOError: if no frame arrives within grab_timeout or the capture thread failed
+        """
+        t_start = monotonic()
+
+        with self._frame_available:
+            while self._latest is None:
+                if self._stop_capture.is_set():
+                    return None
+                if self._capture_error is not None:
+                    raise IOError('Capturing from camera port ' + str(self._camera_port) + ' failed: ' +
+                                  str(self._capture_error))
+                if self._grab_timeout is not None and monotonic() - t_start > self._grab_timeout:
+                    raise IOError('No frame received from camera port ' + str(self._camera_port) + ' within ' +
+                                  str(self._grab_timeout) + ' s!')
+                self._frame_available.wait(WAIT_INTERVAL)
+            buf, frame_id, t_capture = self._latest
+            self._latest = None
+
+        img = cv2.cvtColor(buf, cv2.COLOR_BGR2GRAY)
+
+        # Apply ROIs if specified
+        if self._roi_vertical:
+            img = img[self._roi_vertical[0]:self._roi_vertical[1],
+                      :]
+
+        if self._roi_horizontal:
+            img = img[:,
+                      self._roi_horizontal[0]:self._roi_horizontal[1]]
+
+        data = {'camera_image': img,
+                't_capture': t_capture}
+        start_trace(data, frame_id)
+        add_span(data, 'camera', t_capture)
+
+        return data
+
+    def close(self):
+        """
+        Stops grabbing and releases the camera
+        """
+        self._stop_capture.set()
+        if self._capture_thread is not None:
+            self._capture_thread.join()
+            self._capture_thread = None
+        self._camera.release()
+
+    @property
+    def dropped(self):
+        """
+        :return: number of frames replaced by a newer frame before they were returned by grab
+        """
+        return self._dropped.value
+
+    @property
+    def failed_grabs(self):
+        """
+        :return: number of grabs failed on the device
+        """
+        return self._failed_grabs.value
+
+    def _capture(self):
+        """
+        Grabs frames from the device until close is called, keeping only the newest frame. An exception stopping the
+        thread is passed on to grab.
+        """
+        try:
+            self._capture_frames()
+        except Exception as e:
+            with self._frame_available:
+                self._capture_error = e
+                self._frame_available.notify()
+            raise
+
+    def _capture_frames(self):
+        """
+        Grabs frames from the device until close is called, keeping only the newest frame
+        """
+        frame_id = 0
+
+        while not self._stop_capture.is_set():
+            # Grab and decode frame, backing off if the device fails
+            if not self._camera.grab():
+                self._increment(self._failed_grabs)
+                time.sleep(RETRY_INTERVAL)
+                continue
+            t_capture = monotonic()
+
+            s, buf = self._camera.retrieve()
+            if not s:
+                self._increment(self._failed_grabs)
+                continue
+
+            # Replace the newest frame
+            with self._frame_available:
+                if self._latest is not None:
+                    self._increment(self._dropped)
+                self._latest = (buf, frame_id, t_capture)
+                self._frame_available.notify()
+
+            frame_id += 1
+
+    @staticmethod
+    def _increment(counter):
+        with counter.get_lock():
+            counter.value += 1
 
     def terminate(self):
         """
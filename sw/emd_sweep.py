@@ -0,0 +1,93 @@
+import argparse
+
+import numpy as np
+from configobj import ConfigObj
+
+from benchmarks.frames import load_frames
+from image_processing.motion_detection.ParameterSweep import PARAMETERS, ParameterSweep, parameter_grid
+from image_processing.remapping.Unwarper import Unwarper
+
+# Parse command line arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('input',
+                    type=str,
+                    help='Specify the recorded frames (video file, .npy stack or message log)')
+parser.add_argument('-o', '--output',
+                    default='emd_sweep.npz',
+                    type=str,
+                    dest='output',
+                    help='Specify the file the results table and COMANV traces are written to')
+parser.add_argument('-k', '--key',
+                    default='camera_image',
+                    type=str,
+                    dest='key',
+                    help='Specify the key of the frames in a message log')
+parser.add_argument('-n', '--max-frames',
+                    default=None,
+                    type=int,
+                    dest='max_frames',
+                    help='Specify the maximum number of frames')
+parser.add_argument('-j', '--processes',
+                    default=None,
+                    type=int,
+                    dest='processes',
+                    help='Specify the number of worker processes (number of cores by default)')
+parser.add_argument('--lp-rc',
+                    nargs='+',
+                    type=float,
+                    dest='lp_rc',
+                    help='Specify the low-pass filter RCs (config value by default)')
+parser.add_argument('--lp-dt',
+                    nargs='+',
+                    type=float,
+                    dest='lp_dt',
+                    help='Specify the low-pass filter dTs (config value by default)')
+parser.add_argument('--hp-rc',
+                    nargs='+',
+                    type=float,
+                    dest='hp_rc',
+                    help='Specify the high-pass filter RCs (config value by default)')
+parser.add_argument('--hp-dt',
+                    nargs='+',
+                    type=float,
+                    dest='hp_dt',
+                    help='Specify the high-pass filter dTs (config value by default)')
+args = parser.parse_args()
+
+# Parse configuration file
+config = ConfigObj('config.ini')
+width = config.get('Unwarper').as_int('width')
+height = config.get('Unwarper').as_int('height')
+
+# Load frames and unwarp them unless they already have the size of the remapped image
+frames = load_frames(args.input, args.max_frames, key=args.key)
+if frames.shape[1:] != (height, width):
+    unwarper = Unwarper(input_queue=None,
+                        output_queue=None,
+                        width_rescaled=width,
+                        height_rescaled=height,
+                        scaling_factor=config.get('Unwarper').as_float('scaling_factor'),
+                        calibration_file=config['Unwarper']['calibration_file'],
+                        flip_image=config.get('Unwarper').as_bool('flip_image'),
+                        interpolation=config['Unwarper']['interpolation'],
+                        fixed_point_maps=config.get('Unwarper').as_bool('fixed_point_maps'),
+                        lut_cache_dir=config['Unwarper']['lut_cache_dir'] or None,
+                        lut_cache_size=config.get('Unwarper').as_int('lut_cache_size') * 1024 * 1024)
+    frames = np.stack([unwarper.remap(frame) for frame in frames])
+
+# Build parameter grid, using the configured value for every constant not swept
+grid = parameter_grid(*[getattr(args, name) or [config.get('EMD').as_float(name)]
+                        for name in PARAMETERS])
+print '%d frames of %dx%d, %d parameter sets' % (frames.shape[0], frames.shape[2], frames.shape[1], len(grid))
+
+# Run sweep
+sweep = ParameterSweep(frames, processes=args.processes)
+table, comanv = sweep.run(grid)
+np.savez(args.output, table=table, COMANV=comanv)
+
+# Print results table
+columns = table.dtype.names
+print ' '.join('{:>16}'.format(name) for name in columns)
+for row in table:
+    print ' '.join('{:>16.4f}'.format(row[name]) for name in columns)
+print 'Results written to ' + args.output
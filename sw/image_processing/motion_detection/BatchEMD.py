@@ -0,0 +1,153 @@
+"""
+Implements offline processing of recorded frame sequences by EMD arrays
+"""
+
+import numpy as np
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+from image_processing.motion_detection.COMANV import COMANV
+from image_processing.motion_detection.EMD import EMD
+
+
+class BatchEMD(object):
+    """
+    This class processes stacks of frames of shape (T, height, width) by horizontal and vertical EMD arrays. The
+    temporal high-pass and low-pass filters run along the time axis of a whole chunk of frames at once (using
+    scipy.signal.lfilter if available), the spatial correlations and the nearness maps are computed for the whole
+    chunk with the same kernel as the EMD class. The filter state is carried over between chunks, so the results equal
+    feeding the frames one by one into an EMD instance.
+    """
+
+    def __init__(self,
+                 width, height,
+                 lp_rc, lp_dt,
+                 hp_rc, hp_dt,
+                 chunk_size=128,
+                 fov=2 * np.pi,
+                 mounting_offset=0.0):
+        """
+        Constructor of the BatchEMD class
+
+        :param width: width of the image/EMD
+        :param height: height of the image/EMD
+        :param lp_rc: low-pass filter RC
+        :param lp_dt: low-pass filter dT
+        :param hp_rc: high-pass filter RC
+        :param hp_dt: high-pass filter dT
+        :param chunk_size: number of frames processed at once; bounds the memory used
+        :param fov: horizontal field of view of the frames in radians
+        :param mounting_offset: azimuth of the frame center relative to the robot's heading in radians
+        """
+        self._width = width
+        self._height = height
+        self._chunk_size = chunk_size
+
+        # Filter coefficients
+        self._lp_alpha = float(lp_dt) / (lp_rc + lp_dt)
+        self._hp_alpha = float(hp_rc) / (hp_rc + hp_dt)
+
+        self._comanv = COMANV(width, fov, mounting_offset)
+
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the filter state to that of a newly created EMD
+        """
+        self._oldimg = np.zeros(shape=(self._height, self._width), dtype=np.float32)
+        self._hpimg = np.zeros(shape=(self._height, self._width), dtype=np.float32)
+        self._lpimg = np.zeros(shape=(self._height, self._width), dtype=np.float32)
+
+    def run(self, frames, nearness_maps=False):
+        """
+        Processes a sequence of frames
+
+        :param frames: array of shape (T, height, width), e.g. a memory-mapped recording
+        :param nearness_maps: also returns the nearness maps of all frames if set to true
+        :return: dict containing the average nearness (T, width), the COMANV (T, 2) and optionally the nearness maps
+                 (T, height, width)
+        """
+        results = list(self.process(frames, nearness_maps=nearness_maps))
+
+        data = {'avg_nearness': np.concatenate([r['avg_nearness'] for r in results]),
+                'COMANV': np.concatenate([r['COMANV'] for r in results])}
+        if nearness_maps:
+            data['nearness_map'] = np.concatenate([r['nearness_map'] for r in results])
+
+        return data
+
+    def process(self, frames, nearness_maps=False):
+        """
+        Processes a sequence of frames chunk by chunk
+
+        :param frames: array of shape (T, height, width)
+        :param nearness_maps: also yields the nearness maps of each chunk if set to true
+        :return: generator yielding a dict per chunk (see run)
+        """
+        for start in range(0, len(frames), self._chunk_size):
+            yield self._process_chunk(np.asarray(frames[start:start + self._chunk_size], dtype=np.float32),
+                                      nearness_maps)
+
+    def _process_chunk(self, img, nearness_maps):
+        # Temporal difference of the input, continuing from the last frame of the previous chunk
+        diff = np.empty_like(img)
+        np.subtract(img[0], self._oldimg, out=diff[0])
+        np.subtract(img[1:], img[:-1], out=diff[1:])
+        self._oldimg = img[-1].copy()
+
+        # Temporal high-pass filter: hp[t] = alpha * (hp[t-1] + img[t] - img[t-1])
+        hpimg = self._first_order_filter(diff, self._hp_alpha, self._hp_alpha, self._hpimg)
+        self._hpimg = hpimg[-1].copy()
+
+        # Temporal low-pass filter: lp[t] = alpha * hp[t] + (1 - alpha) * lp[t-1]
+        lpimg = self._first_order_filter(hpimg, self._lp_alpha, 1.0 - self._lp_alpha, self._lpimg)
+        self._lpimg = lpimg[-1].copy()
+
+        # Correlate signals and compute horizontal and vertical EMD output (reusing the diff buffer as scratch)
+        hemd = np.empty_like(img)
+        vemd = np.empty_like(img)
+        EMD._correlate_neighbours(lpimg, hpimg, hemd, vemd, diff)
+
+        # Compute contrast-weighted nearness maps
+        nearness_map = hemd
+        np.multiply(hemd, hemd, out=nearness_map)
+        np.multiply(vemd, vemd, out=vemd)
+        np.add(nearness_map, vemd, out=nearness_map)
+        np.log1p(nearness_map, out=nearness_map)
+
+        # Sum along vertical extent and compute the COMANV of each frame
+        avg_nearness = np.sum(nearness_map, axis=1)
+
+        data = {'avg_nearness': avg_nearness,
+                'COMANV': self._comanv.compute(avg_nearness)}
+        if nearness_maps:
+            data['nearness_map'] = nearness_map
+
+        return data
+
+    @staticmethod
+    def _first_order_filter(x, gain, decay, state):
+        """
+        First-order recursive filter y[t] = gain * x[t] + decay * y[t-1] along the first axis
+
+        :param x: input of shape (T, ...)
+        :param gain: input gain
+        :param decay: feedback coefficient
+        :param state: filter output y[-1] preceding x[0]
+        :return: filter output of the same shape as x
+        """
+        if lfilter is not None:
+            y, _ = lfilter([gain], [1.0, -decay], x, axis=0, zi=(decay * state)[np.newaxis])
+            return y.astype(np.float32, copy=False)
+
+        y = np.empty_like(x)
+        np.multiply(state, decay, out=y[0])
+        y[0] += gain * x[0]
+        for t in range(1, len(x)):
+            np.multiply(y[t - 1], decay, out=y[t])
+            y[t] += gain * x[t]
+        return y
@@ -0,0 +1,105 @@
+"""
+Implements the computation of the Center of Mass Average Nearness Vector (COMANV)
+"""
+
+import numpy as np
+
+# Azimuth weight tables by (width, fov, mounting offset), shared by all COMANV instances of a process
+_weights = {}
+
+
+def azimuth_weights(width, fov=2 * np.pi, mounting_offset=0.0):
+    """
+    Returns the cos/sin weights of the columns of an average nearness array. The tables are computed once per
+    (width, fov, mounting offset) and cached.
+
+    :param width: number of columns
+    :param fov: horizontal field of view covered by the columns in radians
+    :param mounting_offset: azimuth of the center column relative to the robot's heading in radians
+    :return: read-only array of shape (width, 2) holding the cos and sin of the azimuth of each column
+    """
+    key = (int(width), float(fov), float(mounting_offset))
+    try:
+        return _weights[key]
+    except KeyError:
+        pass
+
+    # Columns run from the left (positive azimuth) to the right border of the field of view
+    azimuth = mounting_offset + np.linspace(fov / 2.0, -fov / 2.0, width)
+    weights = np.stack((np.cos(azimuth), np.sin(azimuth)), axis=1)
+    weights.flags.writeable = False
+
+    _weights[key] = weights
+    return weights
+
+
+class COMANV(object):
+    """
+    This class computes the COMANV from average nearness arrays as a single dot product of the average distance with
+    cached azimuth weight tables. The robot's heading is applied by rotating the resulting vector, so heading updates
+    do not rebuild the tables.
+    """
+
+    def __init__(self, width, fov=2 * np.pi, mounting_offset=0.0, heading=0.0):
+        """
+        Constructor of the COMANV class
+
+        :param width: width of the average nearness arrays
+        :param fov: horizontal field of view covered by the arrays in radians
+        :param mounting_offset: azimuth of the center column relative to the robot's heading in radians
+        :param heading: initial heading of the robot in radians
+        """
+        self._weights = azimuth_weights(width, fov, mounting_offset)
+        self.set_heading(heading)
+
+    def set_heading(self, heading):
+        """
+        Sets the heading of the robot the COMANV is rotated by
+
+        :param heading: heading in radians
+        """
+        self._heading = heading
+        self._rotation = self._rotation_matrix(heading)
+
+    def compute(self, avg_nearness, heading=None):
+        """
+        Computes the COMANV of one or more average nearness arrays
+
+        :param avg_nearness: array of shape (width,) or (N, width)
+        :param heading: heading in radians used for this call only (the heading set before if None)
+        :return: array of shape (2,) or (N, 2) holding the x and y components of the COMANV
+        """
+        # Normalize average nearness array
+        avg_nearness_normalized = avg_nearness - np.min(avg_nearness, axis=-1, keepdims=True)
+        avg_nearness_normalized /= np.max(avg_nearness_normalized, axis=-1, keepdims=True)
+
+        # Compute average distance by inverting the array
+        avg_distance = np.max(avg_nearness_normalized, axis=-1, keepdims=True) - avg_nearness_normalized
+
+        return self.from_distance(avg_distance, heading)
+
+    def from_distance(self, avg_distance, heading=None):
+        """
+        Computes the COMANV of one or more average distance arrays
+
+        :param avg_distance: array of shape (width,) or (N, width)
+        :param heading: heading in radians used for this call only (the heading set before if None)
+        :return: array of shape (2,) or (N, 2) holding the x and y components of the COMANV
+        """
+        comanv = np.dot(avg_distance, self._weights)
+
+        # Rotate by the heading of the robot
+        if heading is not None:
+            comanv = np.dot(comanv, self._rotation_matrix(heading))
+        elif self._heading:
+            comanv = np.dot(comanv, self._rotation)
+
+        return comanv
+
+    @staticmethod
+    def _rotation_matrix(heading):
+        """
+        Returns the matrix rotating row vectors by the heading
+        """
+        return np.array([[np.cos(heading), np.sin(heading)],
+                         [-np.sin(heading), np.cos(heading)]])
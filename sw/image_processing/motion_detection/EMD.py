@@ -6,6 +6,12 @@ import multiprocessing
 
 import numpy as np
 
+from image_processing.motion_detection.COMANV import COMANV
+from tracing.trace import add_span, copy_trace, monotonic
+
+# Outputs an EMD can provide
+OUTPUTS = ('nearness_map', 'nearness_map_normalized', 'COMANV')
+
 
 class EMD(multiprocessing.Process):
     """
@@ -16,7 +22,12 @@ class EMD(multiprocessing.Process):
                  input_queue, output_queue,
                  width, height,
                  lp_rc, lp_dt,
-                 hp_rc, hp_dt):
+                 hp_rc, hp_dt,
+                 quantize=False,
+                 outputs=OUTPUTS,
+                 visualization_interval=1,
+                 fov=2 * np.pi,
+                 mounting_offset=0.0):
         """
         Constructor of the EMD class
 
@@ -28,6 +39,12 @@ class EMD(multiprocessing.Process):
         :param lp_dt: low-pass filter dT
         :param hp_rc: high-pass filter RC
         :param hp_dt: high-pass filter dT
+        :param quantize: rounds the filter states to one decimal after each update if set to true
+        :param outputs: outputs to compute (see OUTPUTS) as a sequence or a single name, outputs not listed are never
+                        computed
+        :param visualization_interval: computes the normalized nearness map only every Nth frame
+        :param fov: horizontal field of view of the image in radians
+        :param mounting_offset: azimuth of the image center relative to the robot's heading in radians
         """
         # Initialize multiprocessing.Process parent
         multiprocessing.Process.__init__(self)
@@ -46,11 +63,37 @@ class EMD(multiprocessing.Process):
         self._lp_dt = lp_dt
         self._hp_rc = hp_rc
         self._hp_dt = hp_dt
-
-        self._img = np.zeros(shape=(height, width), dtype=np.int8)
-        self._oldimg = self._img
-        self._hpimg = self._img
-        self._lpimg = self._img
+        self._quantize = quantize
+        self._input_data = None
+
+        # Select outputs (a single output may be given as a plain string)
+        if isinstance(outputs, basestring):
+            outputs = [outputs]
+        unknown = set(outputs) - set(OUTPUTS)
+        if unknown:
+            raise ValueError('Unknown EMD outputs ' + ', '.join(sorted(unknown)) + '!')
+        self._outputs = frozenset(outputs)
+        self._visualization_interval = visualization_interval
+        self._frames = 0
+        self._comanv = COMANV(width, fov, mounting_offset)
+
+        # Filter coefficients
+        self._lp_alpha = float(lp_dt) / (lp_rc + lp_dt)
+        self._hp_alpha = float(hp_rc) / (hp_rc + hp_dt)
+
+        # Persistent filter state
+        self._img = np.zeros(shape=(height, width), dtype=np.float32)
+        self._oldimg = np.zeros(shape=(height, width), dtype=np.float32)
+        self._hpimg = np.zeros(shape=(height, width), dtype=np.float32)
+        self._lpimg = np.zeros(shape=(height, width), dtype=np.float32)
+
+        # Scratch buffers reused on every frame
+        self._hemd = np.zeros(shape=(height, width), dtype=np.float32)
+        self._vemd = np.zeros(shape=(height, width), dtype=np.float32)
+        self._scratch = np.zeros(shape=(height, width), dtype=np.float32)
+        self._nearness_map = np.zeros(shape=(height, width), dtype=np.float32)
+        self._avg_nearness = np.zeros(shape=(width,), dtype=np.float32)
+        self._normalization_scratch = np.zeros(shape=(height, width), dtype=np.float32)
 
     def run(self):
         """
@@ -62,66 +105,22 @@ class EMD(multiprocessing.Process):
 
         # While exit event is not set...
         while not self._exit.is_set():
-            # Get previous image
-            self._oldimg = self._img
-
             # Get data from input queue
-            self._parse_input()
-
-            # Apply temporal high-pass filter to image
-            self._hpimg = self._hp_filter(self._hpimg,
-                                          self._oldimg,
-                                          self._img,
-                                          self._hp_rc,
-                                          self._hp_dt)
-
-            # Apply temporal low-pass filter to image
-            self._lpimg = self._lp_filter(self._lpimg,
-                                          self._hpimg,
-                                          self._lp_rc,
-                                          self._lp_dt)
-
-            # Correlate signals
-            hmult_l, vmult_u, hmult_r, vmult_d = self._multiply_neighbours(self._lpimg, self._hpimg)
-
-            # Compute horizontal and vertical eemd output
-            hemd = hmult_l - hmult_r
-            vemd = vmult_u - vmult_d
-
-            # Compute contrast-weighted nearness map
-            nearness_map = np.log(np.multiply(hemd, hemd) + np.multiply(vemd, vemd) + np.exp(0))
-
-            # - Compute average distance -
-            # Sum EMD output array along vertical extent to obtain average nearness array
-            avg_nearness = np.sum(nearness_map, axis=0)
-
-            # Normalize average nearness array
-            avg_nearness_normalized = avg_nearness - np.min(avg_nearness)
-            avg_nearness_normalized /= np.max(avg_nearness_normalized)
-
-            # Compute average distance by inverting the array
-            avg_distance = np.max(avg_nearness_normalized) - avg_nearness_normalized
-
-            # - Compute Center of Mass Average Nearness Vector (COMANV) -
-            # Initialize azimuth according to horizontal extent of the average distance array assuming 360 degree
-            azimuth = np.linspace(np.pi, -np.pi, avg_distance.shape[0])
-
-            # # Scale and rotate the azimuth according to the FOV of the camera and the robot orientation
-            # azimuth_scale = self._rotation[0] * (np.pi / 180) + azimuth / self._fov_scaling_factor
-
-            # Compute COMANV
-            comanv_x = np.cos(azimuth)
-            comanv_y = np.sin(azimuth)
-            comanv_x = np.multiply(avg_distance, comanv_x)
-            comanv_y = np.multiply(avg_distance, comanv_y)
-            comanv_x = np.sum(comanv_x)
-            comanv_y = np.sum(comanv_y)
-            comanv = [comanv_x, comanv_y]
-
-            # Put data in output queue
-            data = {'nearness_map': nearness_map,
-                    'nearness_map_normalized': self.float2uint8(nearness_map),
-                    'COMANV': comanv}
+            img = self._parse_input()
+            t_enter = monotonic()
+
+            # Forward the end of the stream and stop
+            if self._input_data is None:
+                self._output_queue.put(None)
+                break
+
+            # Process image and put data in output queue. The nearness map is copied since the queue serializes
+            # its items in a background thread while the buffer is overwritten by the next frame.
+            data = self.update(img)
+            if 'nearness_map' in data:
+                data['nearness_map'] = data['nearness_map'].copy()
+            copy_trace(self._input_data, data)
+            add_span(data, 'emd', t_enter)
             self._output_queue.put(data)
 
         # If exit event set...
@@ -130,6 +129,76 @@ class EMD(multiprocessing.Process):
             self._input_queue.task_done()
             self._output_queue.task_done()
 
+    def update(self, img):
+        """
+        Feeds a new image through the EMD array. All intermediate results are written to preallocated buffers.
+
+        :param img: input image of shape (height, width) or None to process the previous image again
+        :return: dict containing the selected outputs (see _output). The nearness map is a view on an internal buffer
+                 that is overwritten by the next update.
+        """
+        # Swap image buffers so the current image becomes the previous one
+        self._oldimg, self._img = self._img, self._oldimg
+        if img is None:
+            self._img[...] = self._oldimg
+        else:
+            self._img[...] = img
+
+        # Apply temporal high-pass filter to image
+        self._hp_filter(self._hpimg,
+                        self._oldimg,
+                        self._img,
+                        self._hp_alpha,
+                        self._scratch,
+                        self._quantize)
+
+        # Apply temporal low-pass filter to image
+        self._lp_filter(self._lpimg,
+                        self._hpimg,
+                        self._lp_alpha,
+                        self._scratch,
+                        self._quantize)
+
+        # Correlate signals and compute horizontal and vertical EMD output
+        self._correlate_neighbours(self._lpimg, self._hpimg, self._hemd, self._vemd, self._scratch)
+
+        # Compute contrast-weighted nearness map
+        nearness_map = self._nearness_map
+        np.multiply(self._hemd, self._hemd, out=nearness_map)
+        np.multiply(self._vemd, self._vemd, out=self._scratch)
+        np.add(nearness_map, self._scratch, out=nearness_map)
+        np.log1p(nearness_map, out=nearness_map)
+
+        # Sum EMD output array along vertical extent to obtain average nearness array
+        avg_nearness = np.sum(nearness_map, axis=0, out=self._avg_nearness)
+
+        return self._output(nearness_map, avg_nearness)
+
+    def _output(self, nearness_map, avg_nearness):
+        """
+        Assembles the selected outputs. The normalized nearness map is only computed every visualization_interval
+        frames, the COMANV is computed from the average nearness (see COMANV).
+
+        :param nearness_map: nearness map of shape (height, width)
+        :param avg_nearness: nearness map summed along the vertical extent
+        :return: dict containing the selected outputs among the nearness map, the normalized nearness map and the
+                 COMANV
+        """
+        data = {}
+
+        if 'nearness_map' in self._outputs:
+            data['nearness_map'] = nearness_map
+
+        if 'nearness_map_normalized' in self._outputs and self._frames % self._visualization_interval == 0:
+            data['nearness_map_normalized'] = self.float2uint8(nearness_map, scratch=self._normalization_scratch)
+
+        if 'COMANV' in self._outputs:
+            data['COMANV'] = self._comanv.compute(avg_nearness).tolist()
+
+        self._frames += 1
+
+        return data
+
     def terminate(self):
         """
         Called when task is terminated. Overwrites multiprocessing.Process.terminate() function
@@ -140,53 +209,114 @@ class EMD(multiprocessing.Process):
     def _parse_input(self):
         """
         Parse data from input queue
+
+        :return: image from input data or None at the end of the stream
         """
         # Get data from queue
         data = self._input_queue.get()
+        self._input_data = data
 
         # Check if new data is available
         if data is not None:
             # Parse data from input queue
             try:
-                self._img = data['remapped_image']
+                return data['remapped_image']
             except KeyError as e:
                 raise KeyError('Key ' + e.args[0] + ' not found in input data!')
 
-    @staticmethod
-    def _lp_filter(oldout, newin, rc, dt):
-        alpha = dt / (rc + dt)
-        return np.round(alpha * newin + (1 - alpha) * oldout, 1)
-
-    @staticmethod
-    def _hp_filter(oldout, oldin, newin, rc, dt):
-        alpha = rc / (rc + dt)
-        return np.round(alpha * (oldout + newin - oldin), 1)
+        return None
 
     @staticmethod
-    def _multiply_neighbours(frame, framen):
-        framenshifteddown = np.roll(framen, 1, axis=0)
-        framenshiftedright = np.roll(framen, 1, axis=1)
-        framenshiftedup = np.roll(framen, -1, axis=0)
-        framenshiftedleft = np.roll(framen, -1, axis=1)
-
-        hrzmultright = np.multiply(frame, framenshiftedleft)
-        hrzmultleft = np.multiply(frame, framenshiftedright)
-        vertmultdown = np.multiply(frame, framenshiftedup)
-        vertmultup = np.multiply(frame, framenshifteddown)
+    def _lp_filter(out, newin, alpha, scratch, quantize=False):
+        """
+        First-order temporal low-pass filter updating the filter state in place
 
-        hrzmultleft = np.roll(hrzmultleft, -1, axis=1)
+        :param out: filter state (previous output), overwritten with the new output
+        :param newin: new input
+        :param alpha: filter coefficient dt / (rc + dt)
+        :param scratch: scratch buffer of the same shape as out
+        :param quantize: rounds the output to one decimal if set to true
+        """
+        np.multiply(out, 1.0 - alpha, out=out)
+        np.multiply(newin, alpha, out=scratch)
+        np.add(out, scratch, out=out)
+        if quantize:
+            np.round(out, 1, out=out)
+        return out
 
-        vertmultup = np.roll(vertmultup, -1, axis=0)
-        np.roll(framen, 1, axis=0)
+    @staticmethod
+    def _hp_filter(out, oldin, newin, alpha, scratch, quantize=False):
+        """
+        First-order temporal high-pass filter updating the filter state in place
+
+        :param out: filter state (previous output), overwritten with the new output
+        :param oldin: previous input
+        :param newin: new input
+        :param alpha: filter coefficient rc / (rc + dt)
+        :param scratch: scratch buffer of the same shape as out
+        :param quantize: rounds the output to one decimal if set to true
+        """
+        np.subtract(newin, oldin, out=scratch)
+        np.add(out, scratch, out=out)
+        np.multiply(out, alpha, out=out)
+        if quantize:
+            np.round(out, 1, out=out)
+        return out
 
-        return hrzmultleft, vertmultup, hrzmultright, vertmultdown
+    @staticmethod
+    def _correlate_neighbours(frame, framen, hemd, vemd, scratch, dtype=None):
+        """
+        Correlates each pixel with its right and lower neighbour (wrapping around at the image borders) and writes the
+        horizontal and vertical EMD outputs. Only slice views and in-place ufuncs are used. The last two axes are
+        the image axes, so stacks of frames of shape (T, height, width) are processed as well.
+
+        hemd[i, j] = frame[i, j+1] * framen[i, j] - frame[i, j] * framen[i, j+1]
+        vemd[i, j] = frame[i+1, j] * framen[i, j] - frame[i, j] * framen[i+1, j]
+
+        :param frame: low-pass filtered frame
+        :param framen: high-pass filtered frame
+        :param hemd: output buffer for the horizontal EMD response
+        :param vemd: output buffer for the vertical EMD response
+        :param scratch: scratch buffer of the same shape as frame
+        :param dtype: dtype the products are computed in (e.g. np.int32 for a widening multiply of int16 frames; the
+                      dtype of the inputs if None)
+        """
+        # Horizontal detectors
+        np.multiply(frame[..., 1:], framen[..., :-1], out=hemd[..., :-1], dtype=dtype)
+        np.multiply(frame[..., :-1], framen[..., 1:], out=scratch[..., :-1], dtype=dtype)
+        np.subtract(hemd[..., :-1], scratch[..., :-1], out=hemd[..., :-1])
+        # Wrap around at the right border
+        np.multiply(frame[..., 0], framen[..., -1], out=hemd[..., -1], dtype=dtype)
+        np.multiply(frame[..., -1], framen[..., 0], out=scratch[..., -1], dtype=dtype)
+        np.subtract(hemd[..., -1], scratch[..., -1], out=hemd[..., -1])
+
+        # Vertical detectors
+        np.multiply(frame[..., 1:, :], framen[..., :-1, :], out=vemd[..., :-1, :], dtype=dtype)
+        np.multiply(frame[..., :-1, :], framen[..., 1:, :], out=scratch[..., :-1, :], dtype=dtype)
+        np.subtract(vemd[..., :-1, :], scratch[..., :-1, :], out=vemd[..., :-1, :])
+        # Wrap around at the lower border
+        np.multiply(frame[..., 0, :], framen[..., -1, :], out=vemd[..., -1, :], dtype=dtype)
+        np.multiply(frame[..., -1, :], framen[..., 0, :], out=scratch[..., -1, :], dtype=dtype)
+        np.subtract(vemd[..., -1, :], scratch[..., -1, :], out=vemd[..., -1, :])
+
+        return hemd, vemd
 
     # Normalise data to uint8
     @staticmethod
-    def float2uint8(image):
+    def float2uint8(image, out=None, scratch=None):
+        """
+        Scales an image to the range [0, 255] and converts it to uint8
+
+        :param image: float image
+        :param out: preallocated uint8 output buffer of the same shape as image (allocated if None)
+        :param scratch: preallocated float buffer of the same shape as image used for the scaling (allocated if None)
+        :return: uint8 image
+        """
         minval = np.amin(image)
         maxval = np.amax(image)
-        image = (image - minval) / (maxval - minval)
-        image *= 255
-        image = image.astype('uint8')
-        return image
+        scaled = np.subtract(image, minval, out=scratch)
+        scaled *= 255 / (maxval - minval)
+        if out is None:
+            return scaled.astype('uint8')
+        out[...] = scaled
+        return out
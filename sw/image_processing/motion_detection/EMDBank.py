@@ -0,0 +1,185 @@
+"""
+Implements image processing by a bank of EMD arrays with several velocity tunings and spatial scales
+"""
+
+import cv2
+import numpy as np
+
+from image_processing.motion_detection.EMD import EMD, OUTPUTS
+
+# Number of elements of the stacked buffers processed at once, chosen so that the buffers of a chunk stay in cache
+CHUNK_ELEMENTS = 64 * 1024
+
+
+class EMDBank(EMD):
+    """
+    This class implements the processing of camera images by a bank of horizontal and vertical EMD arrays tuned to
+    several velocities (pairs of low-pass and high-pass filter RCs) on one or more levels of an image pyramid.
+
+    Per pyramid level, all tunings share the input buffers and each distinct high-pass filter RC is computed only
+    once. Tunings are grouped by their high-pass filter, so the low-pass filters and correlations of a group broadcast
+    against the shared high-pass output without copying it. The filter states of all tunings are stacked and processed
+    in chunks of tunings, so every processing step is a single in-place ufunc call per chunk while the buffers of a
+    chunk stay in cache.
+
+    The motion energies (hemd^2 + vemd^2) of all tunings and levels are averaged at the full resolution and the
+    combined nearness map is computed from the mean energy with a single log1p, which is by far the most expensive
+    step of an EMD. With one tuning and one level the combined nearness map equals the nearness map of the EMD class.
+    The average nearness and the COMANV are computed from the combined nearness map as in the EMD class.
+    """
+
+    def __init__(self,
+                 input_queue, output_queue,
+                 width, height,
+                 tunings,
+                 lp_dt, hp_dt,
+                 levels=1,
+                 outputs=OUTPUTS,
+                 visualization_interval=1,
+                 fov=2 * np.pi,
+                 mounting_offset=0.0):
+        """
+        Constructor of the EMDBank class
+
+        :param input_queue: multiprocessing.JoinableQueue containing input data
+        :param output_queue: multiprocessing.Queue containing output data
+        :param width: width of the image/EMD
+        :param height: height of the image/EMD
+        :param tunings: sequence of (lp_rc, hp_rc) pairs, one per velocity tuning
+        :param lp_dt: low-pass filter dT
+        :param hp_dt: high-pass filter dT
+        :param levels: number of image pyramid levels the bank is applied to (1 = full resolution only)
+        :param outputs: outputs to compute (see EMD)
+        :param visualization_interval: computes the normalized nearness map only every Nth frame
+        :param fov: horizontal field of view of the image in radians
+        :param mounting_offset: azimuth of the image center relative to the robot's heading in radians
+        """
+        if not tunings:
+            raise ValueError('At least one tuning is required!')
+        if levels < 1:
+            raise ValueError('Number of levels must be at least 1, got ' + str(levels) + '!')
+
+        lp_rc = np.array([float(tuning[0]) for tuning in tunings])
+        hp_rc = np.array([float(tuning[1]) for tuning in tunings])
+
+        EMD.__init__(self, input_queue, output_queue, width, height, lp_rc[0], lp_dt, hp_rc[0], hp_dt,
+                     outputs=outputs, visualization_interval=visualization_interval,
+                     fov=fov, mounting_offset=mounting_offset)
+
+        # Order tunings by high-pass filter, so the tunings sharing a high-pass filter are contiguous
+        unique_hp_rc, hp_index = np.unique(hp_rc, return_inverse=True)
+        order = np.argsort(hp_index, kind='mergesort')
+        lp_rc, hp_index = lp_rc[order], hp_index[order]
+
+        # Filter coefficients of the stacked filter states. High-pass filters are shared by tunings with equal RCs.
+        self._lp_alphas = (float(lp_dt) / (lp_rc + lp_dt)).astype(np.float32)[:, np.newaxis, np.newaxis]
+        self._hp_alphas = (unique_hp_rc / (unique_hp_rc + hp_dt)).astype(np.float32)[:, np.newaxis, np.newaxis]
+
+        tunings, filters = len(lp_rc), len(unique_hp_rc)
+
+        # Persistent filter state and scratch buffers per pyramid level. Scratch buffers hold one chunk of tunings.
+        self._levels = []
+        level_height, level_width = height, width
+        for level in range(levels):
+            chunk = min(tunings, max(CHUNK_ELEMENTS // (level_height * level_width), 1))
+
+            # Chunks of tunings (slice of the stacked states, index of their high-pass filter)
+            chunks = []
+            for f in range(filters):
+                first, last = np.searchsorted(hp_index, [f, f + 1])
+                chunks.extend((slice(start, min(start + chunk, last)), f) for start in range(first, last, chunk))
+
+            stack = (chunk, level_height, level_width)
+            self._levels.append({'chunks': chunks,
+                                 'img': np.zeros(shape=(level_height, level_width), dtype=np.float32),
+                                 'oldimg': np.zeros(shape=(level_height, level_width), dtype=np.float32),
+                                 'hpimg': np.zeros(shape=(filters, level_height, level_width), dtype=np.float32),
+                                 'hp_scratch': np.zeros(shape=(filters, level_height, level_width),
+                                                        dtype=np.float32),
+                                 'lpimg': np.zeros(shape=(tunings, level_height, level_width), dtype=np.float32),
+                                 'hemd': np.zeros(shape=stack, dtype=np.float32),
+                                 'vemd': np.zeros(shape=stack, dtype=np.float32),
+                                 'scratch': np.zeros(shape=stack, dtype=np.float32),
+                                 'energy': np.zeros(shape=(level_height, level_width), dtype=np.float32),
+                                 'reduced': np.zeros(shape=(level_height, level_width), dtype=np.float32),
+                                 'upsampled': np.zeros(shape=(height, width), dtype=np.float32)
+                                 if level > 0 else None})
+            # Size of the next level as produced by cv2.pyrDown
+            level_height, level_width = (level_height + 1) // 2, (level_width + 1) // 2
+
+    def update(self, img):
+        """
+        Feeds a new image through the EMD bank. All intermediate results are written to preallocated buffers.
+
+        :param img: input image of shape (height, width) or None to process the previous image again
+        :return: dict containing the selected outputs (see EMD) computed from the combined nearness map. The nearness
+                 map is a view on an internal buffer that is overwritten by the next update.
+        """
+        combined = self._nearness_map
+
+        for index, level in enumerate(self._levels):
+            # Swap image buffers so the current image becomes the previous one
+            level['oldimg'], level['img'] = level['img'], level['oldimg']
+            if img is None:
+                level['img'][...] = level['oldimg']
+            elif index == 0:
+                level['img'][...] = img
+            else:
+                cv2.pyrDown(self._levels[index - 1]['img'], dst=level['img'])
+
+            # Apply temporal high-pass filters to image
+            self._hp_filter(level['hpimg'],
+                            level['oldimg'],
+                            level['img'],
+                            self._hp_alphas,
+                            level['hp_scratch'])
+
+            level['energy'][...] = 0
+            for tunings, hp_filter in level['chunks']:
+                self._update_tunings(level, tunings, hp_filter)
+
+            # Add energy of the level to the combined energy at full resolution
+            if index == 0:
+                combined[...] = level['energy']
+            else:
+                cv2.resize(level['energy'], (self._width, self._height), dst=level['upsampled'],
+                           interpolation=cv2.INTER_LINEAR)
+                np.add(combined, level['upsampled'], out=combined)
+
+        # Compute combined nearness map from the energy averaged over tunings and levels
+        np.multiply(combined, 1.0 / (len(self._lp_alphas) * len(self._levels)), out=combined)
+        np.log1p(combined, out=combined)
+
+        # Sum EMD output array along vertical extent to obtain average nearness array
+        avg_nearness = np.sum(combined, axis=0, out=self._avg_nearness)
+
+        return self._output(combined, avg_nearness)
+
+    def _update_tunings(self, level, tunings, hp_filter):
+        """
+        Updates the low-pass filters and EMD arrays of a chunk of tunings on one pyramid level and adds their motion
+        energies to the energy of the level
+
+        :param level: dict holding the buffers of the level
+        :param tunings: slice selecting the tunings of the chunk
+        :param hp_filter: index of the high-pass filter shared by the tunings of the chunk
+        """
+        lpimg = level['lpimg'][tunings]
+        n = len(lpimg)
+        hemd, vemd, scratch = level['hemd'][:n], level['vemd'][:n], level['scratch'][:n]
+
+        # Shared high-pass output, broadcast against the stacked low-pass states
+        hpimg = level['hpimg'][hp_filter:hp_filter + 1]
+
+        # Apply temporal low-pass filters to high-pass output
+        self._lp_filter(lpimg, hpimg, self._lp_alphas[tunings], scratch)
+
+        # Correlate signals and compute horizontal and vertical EMD output of the tunings
+        self._correlate_neighbours(lpimg, hpimg, hemd, vemd, scratch)
+
+        # Compute motion energies of the tunings and add them to the energy of the level
+        np.multiply(hemd, hemd, out=hemd)
+        np.multiply(vemd, vemd, out=vemd)
+        np.add(hemd, vemd, out=hemd)
+        np.sum(hemd, axis=0, out=level['reduced'])
+        np.add(level['energy'], level['reduced'], out=level['energy'])
@@ -0,0 +1,165 @@
+"""
+Implements image processing by EMD arrays using fixed-point arithmetic
+"""
+
+import numpy as np
+
+from image_processing.motion_detection.EMD import EMD, OUTPUTS
+
+# Fractional bits of the image and filter states (Q7: one gray level equals 128 LSB)
+STATE_BITS = 7
+
+# Fractional bits of the filter coefficients (Q15)
+COEFF_BITS = 15
+
+
+class FixedPointEMD(EMD):
+    """
+    This class implements the processing of camera images by horizontal and vertical EMD arrays using int16 filter
+    states, which halves the memory traffic of the filters compared to the float32 EMD on targets like the Raspberry Pi.
+
+    Images and filter states are stored in Q7 (gray level * 128), the filter coefficients are rounded to Q15 integers.
+    Filter updates are computed in int32 and rounded back to Q7, the correlations use a widening int16 x int16 -> int32
+    multiply and are exact. Only the nearness map is computed in float32.
+
+    Error bounds against the float EMD with the same coefficients (1 LSB = 1/128 gray level, a_hp and a_lp the
+    high-pass and low-pass coefficients):
+
+        high-pass state:  |error| <= 0.5 / (1 - a_hp) LSB
+        low-pass state:   |error| <= 0.5 / (1 - a_hp) + 0.5 / a_lp LSB
+
+    plus the effect of rounding the coefficients to Q15 (relative error <= 2^-16). For the default configuration
+    (hp_rc = 5, lp_rc = 10, dt = 1) this amounts to 3 LSB (0.02 gray levels) for the high-pass and 8.5 LSB (0.07 gray
+    levels) for the low-pass state. The int16 states cannot overflow as long as
+    255 * 128 * a_hp + 0.5 / (1 - a_hp) <= 32767, which is checked on construction.
+
+    The state errors propagate into the correlations relative to the local contrast, so the nearness map deviates most
+    where the EMD response is close to zero. benchmarks/fixed_point_benchmark.py measures the resulting nearness map and
+    COMANV errors.
+    """
+
+    def __init__(self,
+                 input_queue, output_queue,
+                 width, height,
+                 lp_rc, lp_dt,
+                 hp_rc, hp_dt,
+                 outputs=OUTPUTS,
+                 visualization_interval=1,
+                 fov=2 * np.pi,
+                 mounting_offset=0.0):
+        """
+        Constructor of the FixedPointEMD class
+
+        :param input_queue: multiprocessing.JoinableQueue containing input data
+        :param output_queue: multiprocessing.Queue containing output data
+        :param width: width of the image/EMD
+        :param height: height of the image/EMD
+        :param lp_rc: low-pass filter RC
+        :param lp_dt: low-pass filter dT
+        :param hp_rc: high-pass filter RC
+        :param hp_dt: high-pass filter dT
+        :param outputs: outputs to compute (see EMD)
+        :param visualization_interval: computes the normalized nearness map only every Nth frame
+        :param fov: horizontal field of view of the image in radians
+        :param mounting_offset: azimuth of the image center relative to the robot's heading in radians
+        """
+        EMD.__init__(self, input_queue, output_queue, width, height, lp_rc, lp_dt, hp_rc, hp_dt,
+                     outputs=outputs, visualization_interval=visualization_interval,
+                     fov=fov, mounting_offset=mounting_offset)
+
+        # Integer filter coefficients
+        self._lp_coeff = int(round(self._lp_alpha * 2 ** COEFF_BITS))
+        self._hp_coeff = int(round(self._hp_alpha * 2 ** COEFF_BITS))
+
+        # Make sure the high-pass state fits into int16 including its rounding error
+        if 255 * 2 ** STATE_BITS * self._hp_alpha + 0.5 / (1.0 - self._hp_alpha) > np.iinfo(np.int16).max:
+            raise ValueError('High-pass filter RC ' + str(hp_rc) + ' is too large for the fixed-point EMD!')
+
+        # Persistent filter state
+        self._img = np.zeros(shape=(height, width), dtype=np.int16)
+        self._oldimg = np.zeros(shape=(height, width), dtype=np.int16)
+        self._hpimg = np.zeros(shape=(height, width), dtype=np.int16)
+        self._lpimg = np.zeros(shape=(height, width), dtype=np.int16)
+
+        # Scratch buffers reused on every frame
+        self._hemd = np.zeros(shape=(height, width), dtype=np.int32)
+        self._vemd = np.zeros(shape=(height, width), dtype=np.int32)
+        self._scratch = np.zeros(shape=(height, width), dtype=np.int32)
+        self._float_scratch = np.zeros(shape=(height, width), dtype=np.float32)
+
+    def update(self, img):
+        """
+        Feeds a new image through the EMD array. All intermediate results are written to preallocated buffers.
+
+        :param img: input image of shape (height, width) with values in [0, 255] or None to process the previous image
+                    again
+        :return: dict containing the selected outputs (see EMD). The nearness map is a view on an internal buffer
+                 that is overwritten by the next update.
+        """
+        # Swap image buffers so the current image becomes the previous one
+        self._oldimg, self._img = self._img, self._oldimg
+        if img is None:
+            self._img[...] = self._oldimg
+        else:
+            self._img[...] = img
+            np.left_shift(self._img, STATE_BITS, out=self._img)
+
+        # Apply temporal high-pass filter to image
+        self._hp_filter_fixed(self._hpimg, self._oldimg, self._img, self._hp_coeff, self._scratch)
+
+        # Apply temporal low-pass filter to image
+        self._lp_filter_fixed(self._lpimg, self._hpimg, self._lp_coeff, self._scratch)
+
+        # Correlate signals and compute horizontal and vertical EMD output (Q14) using a widening multiply
+        self._correlate_neighbours(self._lpimg, self._hpimg, self._hemd, self._vemd, self._scratch, dtype=np.int32)
+
+        # Compute contrast-weighted nearness map in float32
+        nearness_map = self._nearness_map
+        scale = np.float32(2.0 ** (-2 * STATE_BITS))
+        np.multiply(self._hemd, scale, out=nearness_map, dtype=np.float32)
+        np.multiply(self._vemd, scale, out=self._float_scratch, dtype=np.float32)
+        np.multiply(nearness_map, nearness_map, out=nearness_map)
+        np.multiply(self._float_scratch, self._float_scratch, out=self._float_scratch)
+        np.add(nearness_map, self._float_scratch, out=nearness_map)
+        np.log1p(nearness_map, out=nearness_map)
+
+        # Sum EMD output array along vertical extent to obtain average nearness array
+        avg_nearness = np.sum(nearness_map, axis=0, out=self._avg_nearness)
+
+        return self._output(nearness_map, avg_nearness)
+
+    @staticmethod
+    def _hp_filter_fixed(out, oldin, newin, coeff, scratch):
+        """
+        First-order temporal high-pass filter on Q7 states updating the filter state in place
+
+        :param out: int16 filter state (previous output), overwritten with the new output
+        :param oldin: previous int16 input
+        :param newin: new int16 input
+        :param coeff: Q15 filter coefficient rc / (rc + dt)
+        :param scratch: int32 scratch buffer of the same shape as out
+        """
+        np.subtract(newin, oldin, out=scratch, dtype=np.int32)
+        np.add(scratch, out, out=scratch)
+        np.multiply(scratch, coeff, out=scratch)
+        np.add(scratch, 1 << (COEFF_BITS - 1), out=scratch)
+        np.right_shift(scratch, COEFF_BITS, out=scratch)
+        out[...] = scratch
+        return out
+
+    @staticmethod
+    def _lp_filter_fixed(out, newin, coeff, scratch):
+        """
+        First-order temporal low-pass filter on Q7 states updating the filter state in place
+
+        :param out: int16 filter state (previous output), overwritten with the new output
+        :param newin: new int16 input
+        :param coeff: Q15 filter coefficient dt / (rc + dt)
+        :param scratch: int32 scratch buffer of the same shape as out
+        """
+        np.subtract(newin, out, out=scratch, dtype=np.int32)
+        np.multiply(scratch, coeff, out=scratch)
+        np.add(scratch, 1 << (COEFF_BITS - 1), out=scratch)
+        np.right_shift(scratch, COEFF_BITS, out=scratch)
+        np.add(out, scratch, out=out, casting='unsafe')
+        return out
@@ -0,0 +1,125 @@
+"""
+Implements a parallel sweep of the EMD filter constants over a recorded frame sequence
+"""
+
+import ctypes
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from image_processing.motion_detection.BatchEMD import BatchEMD
+
+# Filter constants swept, in the order of the parameter sets
+PARAMETERS = ('lp_rc', 'lp_dt', 'hp_rc', 'hp_dt')
+
+# Row of the results table: filter constants followed by nearness and COMANV statistics
+RESULT_DTYPE = np.dtype([('lp_rc', 'f8'), ('lp_dt', 'f8'), ('hp_rc', 'f8'), ('hp_dt', 'f8'),
+                         ('nearness_mean', 'f8'), ('nearness_std', 'f8'),
+                         ('comanv_x_mean', 'f8'), ('comanv_y_mean', 'f8'),
+                         ('comanv_norm_mean', 'f8'), ('comanv_norm_std', 'f8')])
+
+# Frames shared with the pool workers (set by _init_worker)
+_frames = None
+
+
+def parameter_grid(lp_rc, lp_dt, hp_rc, hp_dt):
+    """
+    Builds the cartesian product of the given filter constants
+
+    :param lp_rc: sequence of low-pass filter RCs
+    :param lp_dt: sequence of low-pass filter dTs
+    :param hp_rc: sequence of high-pass filter RCs
+    :param hp_dt: sequence of high-pass filter dTs
+    :return: list of (lp_rc, lp_dt, hp_rc, hp_dt) tuples
+    """
+    return list(itertools.product(lp_rc, lp_dt, hp_rc, hp_dt))
+
+
+class ParameterSweep(object):
+    """
+    This class evaluates a grid of EMD filter constants on one recorded frame sequence using a multiprocessing.Pool.
+    The frames are copied once into shared memory that is handed to the workers on creation of the pool, so only the
+    parameter sets and the (small) results are passed between processes.
+    """
+
+    def __init__(self, frames, processes=None, chunk_size=128):
+        """
+        Constructor of the ParameterSweep class
+
+        :param frames: array of shape (T, height, width) holding the (remapped) frames
+        :param processes: number of worker processes (number of cores if None)
+        :param chunk_size: number of frames processed at once by each worker (see BatchEMD)
+        """
+        frames = np.asarray(frames)
+        if frames.ndim != 3:
+            raise ValueError('Expected frames of shape (T, height, width), got ' + str(frames.shape) + '!')
+
+        self._shape = frames.shape
+        self._dtype = frames.dtype
+        self._processes = processes
+        self._chunk_size = chunk_size
+
+        # Copy frames into shared memory once
+        self._buffer = multiprocessing.RawArray(ctypes.c_char, frames.nbytes)
+        np.frombuffer(self._buffer, dtype=self._dtype).reshape(self._shape)[...] = frames
+
+    def run(self, parameter_sets):
+        """
+        Evaluates all parameter sets
+
+        :param parameter_sets: sequence of (lp_rc, lp_dt, hp_rc, hp_dt) tuples
+        :return: results table (structured array of RESULT_DTYPE, one row per parameter set) and COMANV traces of
+                 shape (parameter sets, T, 2)
+        """
+        pool = multiprocessing.Pool(processes=self._processes,
+                                    initializer=_init_worker,
+                                    initargs=(self._buffer, self._dtype.str, self._shape))
+        try:
+            results = pool.map(_evaluate, [(tuple(p), self._chunk_size) for p in parameter_sets], chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        table = np.array([row for row, _ in results], dtype=RESULT_DTYPE)
+        comanv = np.stack([trace for _, trace in results]) if results else np.empty((0, self._shape[0], 2))
+
+        return table, comanv
+
+
+def _init_worker(buffer, dtype, shape):
+    """
+    Initializes a pool worker with a view on the shared frames
+    """
+    global _frames
+    _frames = np.frombuffer(buffer, dtype=np.dtype(dtype)).reshape(shape)
+
+
+def _evaluate(args):
+    """
+    Runs a BatchEMD with one parameter set over the shared frames
+
+    :param args: ((lp_rc, lp_dt, hp_rc, hp_dt), chunk size)
+    :return: row of the results table, COMANV trace of shape (T, 2)
+    """
+    (lp_rc, lp_dt, hp_rc, hp_dt), chunk_size = args
+
+    emd = BatchEMD(width=_frames.shape[2],
+                   height=_frames.shape[1],
+                   lp_rc=lp_rc,
+                   lp_dt=lp_dt,
+                   hp_rc=hp_rc,
+                   hp_dt=hp_dt,
+                   chunk_size=chunk_size)
+    output = emd.run(_frames)
+
+    avg_nearness = output['avg_nearness']
+    comanv = output['COMANV'].astype(np.float32)
+    comanv_norm = np.hypot(comanv[:, 0], comanv[:, 1])
+
+    row = (lp_rc, lp_dt, hp_rc, hp_dt,
+           float(np.mean(avg_nearness)), float(np.std(avg_nearness)),
+           float(np.mean(comanv[:, 0])), float(np.mean(comanv[:, 1])),
+           float(np.mean(comanv_norm)), float(np.std(comanv_norm)))
+
+    return row, comanv
@@ -0,0 +1,244 @@
+"""
+Implements image processing by EMD arrays split into horizontal bands processed on multiple cores
+"""
+
+import ctypes
+import multiprocessing
+
+import numpy as np
+
+from image_processing.motion_detection.EMD import EMD, OUTPUTS
+
+
+def _shared_array(shape):
+    """
+    Allocates a zero-initialized float32 array in shared memory
+    """
+    buf = multiprocessing.RawArray(ctypes.c_float, int(np.prod(shape)))
+    return buf, np.frombuffer(buf, dtype=np.float32).reshape(shape)
+
+
+class TiledEMD(EMD):
+    """
+    This class implements the processing of camera images by horizontal and vertical EMD arrays, splitting the image
+    into horizontal bands that are processed in parallel by EMDBand worker processes.
+
+    The input image, the nearness map, the column sums of each band and the filter state of each band live in
+    shared memory. Each band carries a one-pixel halo (the row below the band, wrapping around at the lower border)
+    whose filter state is updated redundantly by the band's worker, so the vertical correlations at the band borders
+    need no data from other workers. The results equal those of the EMD class.
+    """
+
+    def __init__(self,
+                 input_queue, output_queue,
+                 width, height,
+                 lp_rc, lp_dt,
+                 hp_rc, hp_dt,
+                 quantize=False,
+                 bands=None,
+                 outputs=OUTPUTS,
+                 visualization_interval=1,
+                 fov=2 * np.pi,
+                 mounting_offset=0.0):
+        """
+        Constructor of the TiledEMD class
+
+        :param input_queue: multiprocessing.JoinableQueue containing input data
+        :param output_queue: multiprocessing.Queue containing output data
+        :param width: width of the image/EMD
+        :param height: height of the image/EMD
+        :param lp_rc: low-pass filter RC
+        :param lp_dt: low-pass filter dT
+        :param hp_rc: high-pass filter RC
+        :param hp_dt: high-pass filter dT
+        :param quantize: rounds the filter states to one decimal after each update if set to true
+        :param bands: number of horizontal bands/worker processes (number of cores if None)
+        :param outputs: outputs to compute (see EMD)
+        :param visualization_interval: computes the normalized nearness map only every Nth frame
+        :param fov: horizontal field of view of the image in radians
+        :param mounting_offset: azimuth of the image center relative to the robot's heading in radians
+        """
+        EMD.__init__(self, input_queue, output_queue, width, height, lp_rc, lp_dt, hp_rc, hp_dt, quantize,
+                     outputs, visualization_interval, fov, mounting_offset)
+
+        if bands is None:
+            bands = multiprocessing.cpu_count()
+        if not 1 <= bands <= height:
+            raise ValueError('Number of bands must be between 1 and the height of the image, got ' + str(bands) + '!')
+
+        # Shared input image, nearness map and per-band column sums
+        self._shared_img, self._img = _shared_array((height, width))
+        self._shared_nearness_map, self._nearness_map = _shared_array((height, width))
+        self._shared_column_sums, self._column_sums = _shared_array((bands, width))
+
+        # Split rows into bands of (almost) equal height, each followed by its halo row
+        bounds = np.linspace(0, height, bands + 1).astype(int)
+        self._band_rows = [np.append(np.arange(bounds[index], bounds[index + 1]), bounds[index + 1] % height)
+                           for index in range(bands)]
+
+        # Persistent filter state (previous image, high-pass and low-pass output) of each band including its halo
+        self._shared_band_states = [_shared_array((3, len(rows), width))[0] for rows in self._band_rows]
+
+        # Worker processes and pipes requesting updates, created on the first update
+        self._bands = None
+        self._connections = None
+
+    def update(self, img):
+        """
+        Feeds a new image through the EMD array. The bands are processed by the worker processes, which are started
+        on the first update.
+
+        :param img: input image of shape (height, width) or None to process the previous image again
+        :return: dict containing the selected outputs (see EMD). The nearness map is a view on a shared buffer that is
+                 overwritten by the next update.
+        """
+        if self._bands is None:
+            self._start_bands()
+
+        # Write image to shared memory (the previous image is kept in the filter state of the bands)
+        if img is not None:
+            self._img[...] = img
+
+        # Process bands in parallel and wait for all of them to finish
+        for connection in self._connections:
+            connection.send(True)
+        for connection in self._connections:
+            connection.recv()
+
+        # Merge column sums of the bands into the average nearness array
+        avg_nearness = np.sum(self._column_sums, axis=0, out=self._avg_nearness)
+
+        return self._output(self._nearness_map, avg_nearness)
+
+    def run(self):
+        """
+        Function called when task is started (e.g. task.start()). Overrides run function of multiprocessing. Process
+        parent
+        """
+        try:
+            EMD.run(self)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Stops the worker processes of the bands
+        """
+        if self._bands is not None:
+            for connection in self._connections:
+                connection.send(None)
+            for band in self._bands:
+                band.join()
+            self._bands = None
+            self._connections = None
+
+    def _start_bands(self):
+        """
+        Starts a worker process for each band. The workers are children of the process calling update.
+        """
+        self._bands = []
+        self._connections = []
+        for index, (rows, shared_state) in enumerate(zip(self._band_rows, self._shared_band_states)):
+            connection, band_connection = multiprocessing.Pipe()
+            band = EMDBand(band_connection,
+                           self._shared_img, self._shared_nearness_map, self._shared_column_sums, shared_state,
+                           index, rows,
+                           self._width, self._height,
+                           self._lp_alpha, self._hp_alpha,
+                           self._quantize)
+            band.daemon = True
+            band.start()
+            self._bands.append(band)
+            self._connections.append(connection)
+
+
+class EMDBand(multiprocessing.Process):
+    """
+    This class implements a worker process updating one horizontal band of a TiledEMD
+    """
+
+    def __init__(self,
+                 connection,
+                 shared_img, shared_nearness_map, shared_column_sums, shared_state,
+                 index, rows,
+                 width, height,
+                 lp_alpha, hp_alpha,
+                 quantize=False):
+        """
+        Constructor of the EMDBand class
+
+        :param connection: pipe end receiving update requests (True) or the request to stop (None)
+        :param shared_img: shared input image of shape (height, width)
+        :param shared_nearness_map: shared nearness map of shape (height, width)
+        :param shared_column_sums: shared column sums of shape (bands, width)
+        :param shared_state: shared filter state of shape (3, rows, width)
+        :param index: index of the band
+        :param rows: indices of the rows of the band followed by the halo row
+        :param width: width of the image/EMD
+        :param height: height of the image/EMD
+        :param lp_alpha: low-pass filter coefficient
+        :param hp_alpha: high-pass filter coefficient
+        :param quantize: rounds the filter states to one decimal after each update if set to true
+        """
+        # Initialize multiprocessing.Process parent
+        multiprocessing.Process.__init__(self)
+
+        # Establish pipe
+        self._connection = connection
+
+        # Initialize variables
+        self._shared_img = shared_img
+        self._shared_nearness_map = shared_nearness_map
+        self._shared_column_sums = shared_column_sums
+        self._shared_state = shared_state
+        self._rows = rows
+        self._index = index
+        self._width = width
+        self._height = height
+        self._lp_alpha = lp_alpha
+        self._hp_alpha = hp_alpha
+        self._quantize = quantize
+
+    def run(self):
+        """
+        Function called when task is started (e.g. task.start()). Overrides run function of multiprocessing. Process
+        parent
+        """
+        # Views on shared memory
+        img = np.frombuffer(self._shared_img, dtype=np.float32).reshape(self._height, self._width)
+        nearness_map = np.frombuffer(self._shared_nearness_map, dtype=np.float32).reshape(self._height, self._width)
+        column_sums = np.frombuffer(self._shared_column_sums, dtype=np.float32).reshape(-1, self._width)
+        oldimg, hpimg, lpimg = np.frombuffer(self._shared_state, dtype=np.float32).reshape(3, -1, self._width)
+
+        # Output rows of the band, the halo row is only used for the vertical correlations
+        first_row, rows = self._rows[0], len(self._rows) - 1
+        band_nearness_map = nearness_map[first_row:first_row + rows]
+
+        # Scratch buffers reused on every frame
+        band_img = np.zeros_like(oldimg)
+        hemd = np.zeros_like(oldimg)
+        vemd = np.zeros_like(oldimg)
+        scratch = np.zeros_like(oldimg)
+
+        while self._connection.recv() is not None:
+            # Gather band and halo rows of the input image
+            np.take(img, self._rows, axis=0, out=band_img)
+
+            # Apply temporal high-pass and low-pass filters to the band
+            EMD._hp_filter(hpimg, oldimg, band_img, self._hp_alpha, scratch, self._quantize)
+            EMD._lp_filter(lpimg, hpimg, self._lp_alpha, scratch, self._quantize)
+            oldimg[...] = band_img
+
+            # Correlate signals and compute horizontal and vertical EMD output
+            EMD._correlate_neighbours(lpimg, hpimg, hemd, vemd, scratch)
+
+            # Compute contrast-weighted nearness map of the band
+            np.multiply(hemd[:rows], hemd[:rows], out=band_nearness_map)
+            np.multiply(vemd[:rows], vemd[:rows], out=scratch[:rows])
+            np.add(band_nearness_map, scratch[:rows], out=band_nearness_map)
+            np.log1p(band_nearness_map, out=band_nearness_map)
+
+            # Sum band along vertical extent
+            np.sum(band_nearness_map, axis=0, out=column_sums[self._index])
+
+            self._connection.send(True)
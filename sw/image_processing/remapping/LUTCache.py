@@ -0,0 +1,117 @@
+"""
+Implements a persistent on-disk cache for undistortion LUTs
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+# Bump whenever the LUT generation changes so stale entries are not reused
+LUT_VERSION = 1
+
+
+class LUTCache(object):
+    """
+    This class implements an on-disk cache for the undistortion LUTs created by the OCameraModel. Entries are keyed
+    by the contents of the calibration file and the remap parameters, stored as .npy files and memory-mapped when
+    loaded. The least recently used entries are evicted once the cache exceeds its size limit.
+    """
+
+    def __init__(self, cache_dir, max_size=256 * 1024 * 1024):
+        """
+        Constructor of the LUTCache class
+
+        :param cache_dir: directory holding the cached LUTs
+        :param max_size: maximum size of the cache in bytes
+        """
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+
+        if not os.path.isdir(self._cache_dir):
+            os.makedirs(self._cache_dir)
+
+    @staticmethod
+    def key(calibration_file, **params):
+        """
+        Computes the cache key for a calibration file and a set of remap parameters
+
+        :param calibration_file: calibration file (from OCamModel toolbox) containing camera calibration data
+        :param params: remap parameters (e.g. height, width, scaling factor, mode)
+        :return: hex digest identifying the cache entry
+        """
+        h = hashlib.sha1()
+        with open(calibration_file, 'rb') as f:
+            h.update(f.read())
+        h.update(repr((LUT_VERSION, sorted(params.items()))).encode('utf-8'))
+        return h.hexdigest()
+
+    def load(self, key):
+        """
+        Loads cached LUTs
+
+        :param key: cache key (see LUTCache.key)
+        :return: read-only memory-mapped mapx, mapy or None if the entry is not cached
+        """
+        paths = self._paths(key)
+        try:
+            maps = tuple(np.load(path, mmap_mode='r') for path in paths)
+        except (IOError, OSError, ValueError):
+            return None
+
+        # Mark entry as recently used
+        for path in paths:
+            os.utime(path, None)
+
+        return maps
+
+    def store(self, key, mapx, mapy):
+        """
+        Stores LUTs in the cache and evicts least recently used entries if the size limit is exceeded
+
+        :param key: cache key (see LUTCache.key)
+        :param mapx: x-coordinate LUT
+        :param mapy: y-coordinate LUT
+        """
+        for path, lut in zip(self._paths(key), (mapx, mapy)):
+            # Write to a temporary file first so readers never see partial entries
+            fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, lut)
+            os.rename(tmp_path, path)
+
+        self._evict(keep=key)
+
+    def _paths(self, key):
+        return (os.path.join(self._cache_dir, key + '_mapx.npy'),
+                os.path.join(self._cache_dir, key + '_mapy.npy'))
+
+    def _evict(self, keep=None):
+        """
+        Removes least recently used entries until the cache fits its size limit
+
+        :param keep: key of an entry that must not be evicted
+        """
+        entries = {}
+        for filename in os.listdir(self._cache_dir):
+            if not filename.endswith('.npy'):
+                continue
+            path = os.path.join(self._cache_dir, filename)
+            stat = os.stat(path)
+            key = filename.rsplit('_', 1)[0]
+            last_used, size = entries.get(key, (0, 0))
+            entries[key] = (max(last_used, stat.st_mtime), size + stat.st_size)
+
+        total_size = sum(size for _, size in entries.values())
+        for key, (_, size) in sorted(entries.items(), key=lambda entry: entry[1][0]):
+            if total_size <= self._max_size:
+                break
+            if key == keep:
+                continue
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
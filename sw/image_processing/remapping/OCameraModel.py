@@ -53,62 +53,74 @@ class OCameraModel():
 
         self._model_loaded = True
 
+    def get_image_size(self):
+        """
+        :return: width, height of the calibrated camera image in pixels
+        """
+        return int(self._width), int(self._height)
+
     def cam2world(self, point2d):
+        """
+        Back-projects image points onto unit rays
 
+        :param point2d: image point of shape (2,) or array of image points of shape (N, 2)
+        :return: unit ray(s) of shape (3,) or (N, 3)
+        """
         if not self._model_loaded:
             print "No OCam model loaded. Load a model first using 'get_ocam_model'-method!"
         else:
+            point2d = np.asarray(point2d, dtype=np.float64)
+
             invdet = 1.0 / (self._c - self._d * self._e)
-            xp = invdet * ((point2d[0] - self._xc) - self._d * (point2d[1] - self._yc))
-            yp = invdet * (-self._e * (point2d[0] - self._xc) + self._c * (point2d[1] - self._yc))
+            xp = invdet * ((point2d[..., 0] - self._xc) - self._d * (point2d[..., 1] - self._yc))
+            yp = invdet * (-self._e * (point2d[..., 0] - self._xc) + self._c * (point2d[..., 1] - self._yc))
 
             r = np.sqrt(xp * xp + yp * yp)
-            zp = self._pol[0]
-            r_i = 1
-
-            for i in xrange(1, self._length_pol):
-                r_i *= r
-                zp += r_i * self._pol[i]
+            zp = np.polyval(self._pol[self._length_pol - 1::-1], r)
 
             invnorm = 1 / np.sqrt(xp * xp + yp * yp + zp * zp)
 
-            point3d = np.zeros(3, np.float)
-            point3d[0] = invnorm * xp
-            point3d[1] = invnorm * yp
-            point3d[2] = invnorm * zp
-
-            return point3d
+            return np.stack((invnorm * xp, invnorm * yp, invnorm * zp), axis=-1)
 
     def world2cam(self, point3d):
+        """
+        Projects world points onto the image
+
+        :param point3d: world point of shape (3,) or array of world points of shape (N, 3)
+        :return: image point(s) of shape (2,) or (N, 2)
+        """
         if not self._model_loaded:
             print "No OCam model loaded. Load a model first using 'get_ocam_model'-method!"
         else:
-            norm = np.sqrt(point3d[0] * point3d[0] + point3d[1] * point3d[1])
-            theta = np.arctan(point3d[2] / norm)
+            point3d = np.asarray(point3d, dtype=np.float64)
 
-            point2d = np.zeros(2, np.float)
+            return np.stack(self._world2cam(point3d[..., 0], point3d[..., 1], point3d[..., 2]), axis=-1)
 
-            if norm != 0:
-                invnorm = 1 / norm
-                t = theta
-                rho = self._invpol[0]
-                t_i = 1
+    def _world2cam(self, x3, y3, z3):
+        """
+        Projects world points given as broadcastable coordinate arrays onto the image
 
-                for i in xrange(1, self._length_invpol):
-                    t_i *= t
-                    rho += t_i * self._invpol[i]
+        :param x3: x-coordinates of the world points
+        :param y3: y-coordinates of the world points
+        :param z3: z-coordinates of the world points
+        :return: row and column coordinates of the image points
+        """
+        norm = np.sqrt(x3 * x3 + y3 * y3)
 
-                x = point3d[0] * invnorm * rho
-                y = point3d[1] * invnorm * rho
+        # Points on the optical axis map onto the image center
+        on_axis = norm == 0
+        norm = np.where(on_axis, 1.0, norm)
 
-                point2d[0] = x * self._c + y * self._d + self._xc
-                point2d[1] = x * self._e + y + self._yc
+        theta = np.arctan(z3 / norm)
+        rho = np.polyval(self._invpol[self._length_invpol - 1::-1], theta)
 
-            else:
-                point2d[0] = self._xc
-                point2d[1] = self._yc
+        x = x3 * (rho / norm)
+        y = y3 * (rho / norm)
 
-            return point2d
+        row = np.where(on_axis, self._xc, x * self._c + y * self._d + self._xc)
+        col = np.where(on_axis, self._yc, x * self._e + y + self._yc)
+
+        return row, col
 
     def create_perspective_undistortion_lut(self, height, width, sf):
         height = int(height)
@@ -118,38 +130,56 @@ class OCameraModel():
         nyc = width / 2.0
         nz = -width / sf
 
-        mapx = np.zeros([height, width], np.float32)
-        mapy = np.zeros([height, width], np.float32)
-
-        m = np.zeros(3, np.float)
-
-        for i in xrange(height):
-            for j in xrange(width):
-                m[0] = i - nxc
-                m[1] = j - nyc
-                m[2] = nz
+        # World coordinates of the output pixel grid (rows and columns broadcast against each other)
+        m0 = (np.arange(height, dtype=np.float64) - nxc)[:, np.newaxis]
+        m1 = (np.arange(width, dtype=np.float64) - nyc)[np.newaxis, :]
 
-                remapped_m = self.world2cam(m)
+        # Project the whole grid onto the image plane
+        row, col = self._world2cam(m0, m1, nz)
 
-                mapx[i, j] = remapped_m[1]
-                mapy[i, j] = remapped_m[0]
+        mapx = col.astype(np.float32)
+        mapy = row.astype(np.float32)
 
         return mapx, mapy
 
-    def create_panoramic_undistortion_lut(self, height, width, rmax=470, rmin=20):
+    def create_panoramic_undistortion_lut(self, height, width, rmax=470, rmin=20,
+                                          azimuth_range=(0.0, 2 * np.pi), elevation_range=None):
+        """
+        Creates LUTs unwrapping the omnidirectional image into a panorama. Columns sample the azimuth, rows sample
+        the radius (or elevation) from the outer to the inner border of the panorama. All ranges are end-exclusive:
+        the columns (rows) divide a range into width (height) equal steps starting at its start, so the last column
+        (row) lies one step before its stop.
+
+        :param height: height of the panorama
+        :param width: width of the panorama
+        :param rmax: image radius of the first row (used if elevation_range is None)
+        :param rmin: image radius the rows run towards (used if elevation_range is None). The last row lies at
+                     rmin + (rmax - rmin) / height. The step is computed in float arithmetic, the former per-pixel loop
+                     truncated it with integer division for integer radii.
+        :param azimuth_range: (start, stop) azimuth in radians spanned by the columns
+        :param elevation_range: (start, stop) elevation in radians spanned by the rows, the first row lies at start.
+                                The image radii are obtained from the inverse polynomial of the model.
+        :return: mapx, mapy LUTs (float32) for cv2.remap
+        """
         height = int(height)
         width = int(width)
 
-        mapx = np.zeros([height, width], np.float32)
-        mapy = np.zeros([height, width], np.float32)
+        # Azimuth of every column
+        azimuth_start, azimuth_stop = azimuth_range
+        theta = -(azimuth_start + (azimuth_stop - azimuth_start) * np.arange(width, dtype=np.float64) / width)
 
-        for i in xrange(height):
-            for j in xrange(width):
-                theta = -(float(j)) / width * 2 * np.pi
-                rho = rmax - (rmax - rmin) / height * i
-
-                mapx[i, j] = self._yc + rho * np.sin(theta)
-                mapy[i, j] = self._xc + rho * np.cos(theta)
+        # Image radius of every row
+        if elevation_range is None:
+            rho = rmax - (rmax - rmin) * np.arange(height, dtype=np.float64) / height
+        else:
+            elevation_start, elevation_stop = elevation_range
+            elevation = elevation_start + \
+                (elevation_stop - elevation_start) * np.arange(height, dtype=np.float64) / height
+            rho = np.polyval(self._invpol[self._length_invpol - 1::-1], elevation)
+
+        # Outer products of radii and precomputed trig vectors
+        mapx = (self._yc + np.outer(rho, np.sin(theta))).astype(np.float32)
+        mapy = (self._xc + np.outer(rho, np.cos(theta))).astype(np.float32)
 
         return mapx, mapy
 
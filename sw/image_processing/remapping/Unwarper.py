@@ -5,7 +5,14 @@ Implements a task for unwarping the camera images
 import multiprocessing
 
 import cv2
+import numpy as np
+from image_processing.remapping.LUTCache import LUTCache
 from image_processing.remapping.OCameraModel import OCameraModel
+from tracing.trace import add_span, copy_trace, monotonic
+
+# Interpolation modes supported for remapping
+INTERPOLATION_MODES = {'nearest': cv2.INTER_NEAREST,
+                       'linear': cv2.INTER_LINEAR}
 
 
 class Unwarper(multiprocessing.Process):
@@ -17,7 +24,17 @@ class Unwarper(multiprocessing.Process):
                  width_rescaled, height_rescaled,
                  scaling_factor,
                  calibration_file,
-                 flip_image=False):
+                 flip_image=False,
+                 mode='perspective',
+                 azimuth_range=(0.0, 2 * np.pi),
+                 elevation_range=None,
+                 lut_cache_dir=None,
+                 lut_cache_size=256 * 1024 * 1024,
+                 interpolation='linear',
+                 fixed_point_maps=False,
+                 input_scale=1.0,
+                 roi_vertical=None,
+                 roi_horizontal=None):
         """
         Constructor of the Unwarping class
 
@@ -27,6 +44,18 @@ class Unwarper(multiprocessing.Process):
         :param height_rescaled: height of the remapped image
         :param flip_image: flips the image upside down if set to true
         :param calibration_file: calibration file (from OCamModel toolbox) containing camera calibration data
+        :param mode: 'perspective' for a perspective undistortion or 'panoramic' for unwrapping into a panorama
+        :param azimuth_range: (start, stop) azimuth in radians covered by the panorama (panoramic mode only)
+        :param elevation_range: (top, bottom) elevation in radians covered by the panorama (panoramic mode only)
+        :param lut_cache_dir: directory for caching the undistortion LUTs on disk (no caching if None)
+        :param lut_cache_size: maximum size of the LUT cache in bytes
+        :param interpolation: interpolation used for remapping ('nearest' or 'linear')
+        :param fixed_point_maps: converts the LUTs to OpenCV's fixed-point representation (CV_16SC2 + CV_16UC1) for
+                                 faster remapping if set to true
+        :param input_scale: size of the input image relative to the calibrated image size (e.g. 0.5 if the camera
+                            delivers images at half the calibrated resolution)
+        :param roi_vertical: vertical region-of-interest (first, last row) the input image was cropped to
+        :param roi_horizontal: horizontal region-of-interest (first, last column) the input image was cropped to
         """
 
         # Initialize multiprocessing.Process parent
@@ -41,22 +70,53 @@ class Unwarper(multiprocessing.Process):
 
         # Initialize variables
         self._img = None
+        self._input_data = None
         self._width_rescaled = width_rescaled
         self._height_rescaled = height_rescaled
         self._flip_image = flip_image
         self._scaling_factor = scaling_factor
         self._calibration_file = calibration_file
-
-        # Initialize omidirectional camera model
-        self._ocammodel = OCameraModel()
-
-        # Parse calibration file
-        self._ocammodel.get_ocam_model(self._calibration_file)
-
-        # Get undistortion LUTs
-        self._mapx, self._mapy = self._ocammodel.create_perspective_undistortion_lut(self._height_rescaled,
-                                                                                     self._width_rescaled,
-                                                                                     self._scaling_factor)
+        self._mode = mode
+        self._azimuth_range = azimuth_range
+        self._elevation_range = elevation_range
+        self._input_scale = input_scale
+        self._roi_vertical = roi_vertical
+        self._roi_horizontal = roi_horizontal
+
+        # Get undistortion LUTs, either from the on-disk cache or by building them from the camera model
+        if lut_cache_dir is not None:
+            lut_cache = LUTCache(lut_cache_dir, max_size=lut_cache_size)
+            key = lut_cache.key(self._calibration_file,
+                                height=self._height_rescaled,
+                                width=self._width_rescaled,
+                                scaling_factor=self._scaling_factor,
+                                mode=self._mode,
+                                azimuth_range=self._azimuth_range,
+                                elevation_range=self._elevation_range,
+                                flip_image=self._flip_image,
+                                input_scale=self._input_scale,
+                                roi_vertical=self._roi_vertical,
+                                roi_horizontal=self._roi_horizontal)
+            luts = lut_cache.load(key)
+            if luts is None:
+                luts = self._create_luts()
+                lut_cache.store(key, *luts)
+        else:
+            luts = self._create_luts()
+        self._mapx, self._mapy = luts
+
+        # Select interpolation
+        try:
+            self._interpolation = INTERPOLATION_MODES[interpolation]
+        except KeyError:
+            raise ValueError('Unknown interpolation ' + str(interpolation) + '!')
+
+        # Convert LUTs to fixed-point representation once
+        if fixed_point_maps:
+            self._map1, self._map2 = cv2.convertMaps(np.asarray(self._mapx), np.asarray(self._mapy), cv2.CV_16SC2,
+                                                     nninterpolation=self._interpolation == cv2.INTER_NEAREST)
+        else:
+            self._map1, self._map2 = self._mapx, self._mapy
 
     def run(self):
         """
@@ -70,17 +130,31 @@ class Unwarper(multiprocessing.Process):
         while not self._exit.is_set():
             # ...get data from input queue
             self._parse_input()
+            t_enter = monotonic()
 
-            # ...remap image
-            img_remapped = cv2.remap(self._img, self._mapx, self._mapy, cv2.INTER_AREA)
+            # ...forward the end of the stream and stop
+            if self._input_data is None:
+                self._output_queue.put(None)
+                break
 
-            # ...flip image
-            if self._flip_image:
-                img_remapped = cv2.flip(img_remapped, 0)
-                img_remapped = cv2.flip(img_remapped, 1)
+            # ...remap image
+            data = {'remapped_image': self.remap(self._img)}
+            copy_trace(self._input_data, data)
+            add_span(data, 'unwarper', t_enter)
 
             # ...put image in output queue
-            self._output_queue.put(({'remapped_image': img_remapped}))
+            self._output_queue.put(data)
+
+    def remap(self, img, out=None):
+        """
+        Unwarps an image using the undistortion LUTs
+
+        :param img: camera image
+        :param out: preallocated output image of shape (height_rescaled, width_rescaled) (allocated if None)
+        :return: remapped image
+        """
+        # Flip, ROI and input scaling are part of the LUTs, so a single remap suffices
+        return cv2.remap(img, self._map1, self._map2, self._interpolation, dst=out)
 
     def terminate(self):
         """
@@ -95,6 +169,7 @@ class Unwarper(multiprocessing.Process):
         """
         # Get data from queue
         data = self._input_queue.get()
+        self._input_data = data
 
         if data is not None:
             # Parse data from input queue
@@ -102,3 +177,48 @@ class Unwarper(multiprocessing.Process):
                 self._img = data['camera_image']
             except KeyError as e:
                 raise KeyError('Key ' + e.args[0] + ' not found in input data!')
+
+    def _create_luts(self):
+        """
+        Creates the undistortion LUTs from the calibration file. Flipping, ROI cropping and scaling of the input image
+        are composed into the LUTs.
+
+        :return: mapx, mapy LUTs for cv2.remap
+        """
+        # Initialize omidirectional camera model
+        ocammodel = OCameraModel()
+
+        # Parse calibration file
+        ocammodel.get_ocam_model(self._calibration_file)
+
+        # Get undistortion LUTs
+        if self._mode == 'perspective':
+            mapx, mapy = ocammodel.create_perspective_undistortion_lut(self._height_rescaled,
+                                                                       self._width_rescaled,
+                                                                       self._scaling_factor)
+        elif self._mode == 'panoramic':
+            mapx, mapy = ocammodel.create_panoramic_undistortion_lut(self._height_rescaled,
+                                                                     self._width_rescaled,
+                                                                     azimuth_range=self._azimuth_range,
+                                                                     elevation_range=self._elevation_range)
+        else:
+            raise ValueError('Unknown unwarping mode ' + str(self._mode) + '!')
+
+        # Rotate the output by 180 degrees by reversing the LUTs
+        if self._flip_image:
+            mapx = np.ascontiguousarray(mapx[::-1, ::-1])
+            mapy = np.ascontiguousarray(mapy[::-1, ::-1])
+
+        # Map calibrated image coordinates onto the (scaled) input image, keeping pixel centers aligned
+        if self._input_scale != 1.0:
+            offset = 0.5 * (self._input_scale - 1.0)
+            mapx = mapx * np.float32(self._input_scale) + np.float32(offset)
+            mapy = mapy * np.float32(self._input_scale) + np.float32(offset)
+
+        # Shift coordinates into the region-of-interest the input image was cropped to
+        if self._roi_horizontal:
+            mapx -= np.float32(self._roi_horizontal[0])
+        if self._roi_vertical:
+            mapy -= np.float32(self._roi_vertical[0])
+
+        return mapx, mapy
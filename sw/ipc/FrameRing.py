@@ -0,0 +1,145 @@
+"""
+Implements a shared-memory ring buffer for passing frames between processes
+"""
+
+import ctypes
+import multiprocessing
+
+import numpy as np
+
+from ipc.LatestValueChannel import LatestValueChannel
+
+
+class FrameRing(object):
+    """
+    This class implements a shared-memory ring buffer for fixed-shape frames. It can be used instead of a
+    multiprocessing.Queue between a producer and a consumer process exchanging data dicts.
+
+    The frame stored under key is written into the next slot of the ring, only the slot index, a sequence number and
+    the remaining (small) items of the data dict are passed through a LatestValueChannel. Each slot carries the
+    sequence number of the frame it holds, so the consumer can detect slots overwritten by the producer before they
+    were read. Such frames are dropped.
+
+    The ring supports a single producer and a single consumer and must be created before the processes are started.
+    """
+
+    def __init__(self, key, shape, dtype=np.uint8, slots=4):
+        """
+        Constructor of the FrameRing class
+
+        :param key: key of the frame in the data dicts (e.g. 'camera_image')
+        :param shape: shape of the frames
+        :param dtype: dtype of the frames
+        :param slots: number of slots of the ring
+        """
+        self._key = key
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+        self._slots = slots
+
+        # Shared frame memory and sequence number of the frame held by each slot (0 while a slot is being written)
+        frame_size = int(np.prod(self._shape)) * self._dtype.itemsize
+        self._buffer = multiprocessing.RawArray(ctypes.c_char, frame_size * slots)
+        self._sequence = multiprocessing.RawArray(ctypes.c_ulonglong, slots)
+        self._frames = np.frombuffer(self._buffer, dtype=self._dtype).reshape((slots,) + self._shape)
+
+        # Signals slot indices to the consumer. Keeping at most slots - 1 signals ensures that signalled slots are
+        # not overwritten by the producer before the consumer had a chance to read them.
+        self._signal = LatestValueChannel(depth=max(1, slots - 1))
+        self._overwritten = multiprocessing.Value('L', 0)
+
+        # Sequence number of the next frame (producer only)
+        self._next_sequence = 1
+
+    def put(self, data):
+        """
+        Writes the frame of a data dict into the next slot and signals it to the consumer
+
+        :param data: dict containing the frame under key, or None
+        :raises ValueError: if the shape of the frame does not match the shape of the slots
+        """
+        if data is None:
+            self._signal.put(None)
+            return
+
+        frame = data[self._key]
+        if np.shape(frame) != self._shape:
+            raise ValueError('Frame of shape ' + str(np.shape(frame)) + ' does not fit into ring slots of shape ' +
+                             str(self._shape) + '!')
+
+        sequence = self._next_sequence
+        self._next_sequence += 1
+        slot = sequence % self._slots
+
+        # Invalidate slot while it is written
+        self._sequence[slot] = 0
+        self._frames[slot][...] = frame
+        self._sequence[slot] = sequence
+
+        meta = dict((key, item) for key, item in data.items() if key != self._key)
+        self._signal.put((slot, sequence, meta))
+
+    def get(self, block=True, timeout=None, copy=True):
+        """
+        Gets the oldest frame signalled to the consumer
+
+        :param block: blocks until a frame is available if set to true
+        :param timeout: maximum time to block in seconds (no limit if None)
+        :param copy: returns a copy of the frame if set to true. Otherwise the frame is a view on the shared slot
+                     which is only valid until the producer wraps around the ring.
+        :return: data dict containing the frame under key, or None
+        :raises Queue.Empty: if no frame is available
+        """
+        while True:
+            signal = self._signal.get(block, timeout)
+            if signal is None:
+                return None
+
+            slot, sequence, data = signal
+            if self._sequence[slot] != sequence:
+                self._count_overwritten()
+                continue
+
+            frame = self._frames[slot]
+            if copy:
+                frame = frame.copy()
+                # Make sure the slot was not overwritten while copying
+                if self._sequence[slot] != sequence:
+                    self._count_overwritten()
+                    continue
+
+            data[self._key] = frame
+            return data
+
+    def get_nowait(self, copy=True):
+        """
+        Gets the oldest frame signalled to the consumer without blocking
+
+        :param copy: returns a copy of the frame if set to true (see get)
+        :return: data dict containing the frame under key, or None
+        :raises Queue.Empty: if no frame is available
+        """
+        return self.get(block=False, copy=copy)
+
+    def empty(self):
+        """
+        :return: True if no frame is signalled to the consumer
+        """
+        return self._signal.empty()
+
+    def task_done(self):
+        """
+        Provided for compatibility with multiprocessing.JoinableQueue, frames are not tracked
+        """
+        pass
+
+    @property
+    def dropped(self):
+        """
+        :return: number of frames dropped because the consumer fell behind
+        """
+        return self._signal.dropped + self._overwritten.value
+
+    def _count_overwritten(self):
+        with self._overwritten.get_lock():
+            self._overwritten.value += 1
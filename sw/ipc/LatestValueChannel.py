@@ -0,0 +1,91 @@
+"""
+Implements a bounded channel between processes that keeps only the latest values
+"""
+
+import multiprocessing
+import pickle
+import Queue
+
+
+class LatestValueChannel(object):
+    """
+    This class implements a bounded, drop-oldest channel between processes. When a value is put into a full channel
+    the oldest value is discarded, so a slow consumer always receives the most recent values and never lags more than
+    depth values behind.
+
+    Values are pickled by the producer and only unpickled when a consumer gets them, so discarded values are never
+    deserialized.
+    """
+
+    def __init__(self, depth=1):
+        """
+        Constructor of the LatestValueChannel class
+
+        :param depth: maximum number of values held by the channel
+        """
+        self._queue = multiprocessing.Queue(maxsize=depth)
+        self._lock = multiprocessing.Lock()
+        self._dropped = multiprocessing.Value('L', 0)
+
+    def put(self, value):
+        """
+        Puts a value into the channel, discarding the oldest value if the channel is full
+
+        :param value: value to be put into the channel
+        """
+        buf = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            while True:
+                try:
+                    self._queue.put_nowait(buf)
+                    return
+                except Queue.Full:
+                    pass
+
+                # Discard the oldest value without unpickling it
+                try:
+                    self._queue.get_nowait()
+                    with self._dropped.get_lock():
+                        self._dropped.value += 1
+                except Queue.Empty:
+                    pass
+
+    def get(self, block=True, timeout=None):
+        """
+        Gets the oldest value held by the channel
+
+        :param block: blocks until a value is available if set to true
+        :param timeout: maximum time to block in seconds (no limit if None)
+        :return: value
+        :raises Queue.Empty: if no value is available
+        """
+        return pickle.loads(self._queue.get(block, timeout))
+
+    def get_nowait(self):
+        """
+        Gets the oldest value held by the channel without blocking
+
+        :return: value
+        :raises Queue.Empty: if no value is available
+        """
+        return self.get(block=False)
+
+    def empty(self):
+        """
+        :return: True if the channel holds no value
+        """
+        return self._queue.empty()
+
+    def task_done(self):
+        """
+        Provided for compatibility with multiprocessing.JoinableQueue, values are not tracked
+        """
+        pass
+
+    @property
+    def dropped(self):
+        """
+        :return: number of values discarded because the channel was full
+        """
+        return self._dropped.value
@@ -2,12 +2,21 @@ import Queue
 import multiprocessing
 from configobj import ConfigObj
 import cv2
+import numpy as np
 
 from camera.webcam.WebCamClient import Camera
+from camera.file.FileCameraClient import Camera as FileCamera
+from camera.synthetic.SyntheticCameraClient import Camera as SyntheticCamera
 #from camera.picamera.PiCameraClient import Camera
 from image_processing.remapping.Unwarper import Unwarper
 from image_processing.motion_detection.EMD import EMD
+from image_processing.motion_detection.EMDBank import EMDBank
+from image_processing.motion_detection.FixedPointEMD import FixedPointEMD
+from image_processing.motion_detection.TiledEMD import TiledEMD
 from calibration.Calibration import Calibration
+from ipc.FrameRing import FrameRing
+from ipc.LatestValueChannel import LatestValueChannel
+from pipeline.FusedPipeline import FusedPipeline
 from zmq_socket.Publisher import Publisher
 from zmq_socket.Subscriber import Subscriber
 
@@ -16,59 +25,114 @@ config_file = 'config.ini'
 config = ConfigObj(config_file)
 
 # Initialize queues
-queues = {'camera_out': multiprocessing.Queue(),
-          'unwarper_in': multiprocessing.JoinableQueue(),
-          'unwarper_out': multiprocessing.Queue(),
-          'emd_in': multiprocessing.JoinableQueue(),
-          'emd_out': multiprocessing.Queue(),
+# Camera and remapped images are passed through shared memory, the frame shapes follow from the configuration
+camera_width, camera_height = map(int, config['Camera']['resolution'])
+queues = {'unwarper_in': FrameRing('camera_image', shape=(camera_height, camera_width)),
+          'emd_in': FrameRing('remapped_image', shape=(config.get('Unwarper').as_int('height'),
+                                                       config.get('Unwarper').as_int('width'))),
           'calibration_in': multiprocessing.JoinableQueue(),
-          'zmq_socket_in': multiprocessing.JoinableQueue(),
-          'zmq_socket_out': multiprocessing.Queue()}
+          'zmq_socket_in': LatestValueChannel(),
+          'zmq_socket_out': LatestValueChannel()}
 
 # Initialize tasks
-print map(int, config['Camera']['roi_vertical'])
-camera = Camera(output_queue=queues['camera_out'],
-                camera_port=config.get('Camera').as_int('port'),
-                #roi_vertical=map(int, config['Camera']['roi_vertical']),
-                #roi_horizontal=map(int, config['Camera']['roi_horizontal'])
-                )
+if config['Camera']['source'] == 'file':
+    camera = FileCamera(output_queue=queues['unwarper_in'],
+                        path=config['Camera']['path'],
+                        fps=config.get('Camera').as_int('fps'))
+elif config['Camera']['source'] == 'synthetic':
+    camera = SyntheticCamera(output_queue=queues['unwarper_in'],
+                             width=camera_width,
+                             height=camera_height,
+                             flow=map(float, config['Camera']['flow']),
+                             fps=config.get('Camera').as_int('fps'))
+else:
+    camera = Camera(output_queue=queues['unwarper_in'],
+                    camera_port=config.get('Camera').as_int('port'),
+                    resolution=(camera_width, camera_height),
+                    fps=config.get('Camera').as_int('fps'),
+                    fourcc=config['Camera']['fourcc'],
+                    #roi_vertical=map(int, config['Camera']['roi_vertical']),
+                    #roi_horizontal=map(int, config['Camera']['roi_horizontal'])
+                    )
 
-'''
 unwarper = Unwarper(input_queue=queues['unwarper_in'],
-                    output_queue=queues['unwarper_out'],
-                    width_rescaled=,
-                    height_rescaled=,
-                    scaling_factor=,
-                    calibration_file=)
+                    output_queue=queues['emd_in'],
+                    width_rescaled=config.get('Unwarper').as_int('width'),
+                    height_rescaled=config.get('Unwarper').as_int('height'),
+                    scaling_factor=config.get('Unwarper').as_float('scaling_factor'),
+                    calibration_file=config['Unwarper']['calibration_file'],
+                    flip_image=config.get('Unwarper').as_bool('flip_image'),
+                    interpolation=config['Unwarper']['interpolation'],
+                    fixed_point_maps=config.get('Unwarper').as_bool('fixed_point_maps'),
+                    lut_cache_dir=config['Unwarper']['lut_cache_dir'] or None,
+                    lut_cache_size=config.get('Unwarper').as_int('lut_cache_size') * 1024 * 1024)
 
-emd = EMD(input_queue=queues['emd_in'],
-          output_queue=queues['emd_out'],
-          width=,
-          height=,
-          lp_rc=,
-          lp_dt=,
-          hp_rc=,
-          hp_dt=)
+emd_parameters = dict(input_queue=queues['emd_in'],
+                      output_queue=queues['zmq_socket_in'],
+                      width=config.get('Unwarper').as_int('width'),
+                      height=config.get('Unwarper').as_int('height'),
+                      lp_rc=config.get('EMD').as_float('lp_rc'),
+                      lp_dt=config.get('EMD').as_float('lp_dt'),
+                      hp_rc=config.get('EMD').as_float('hp_rc'),
+                      hp_dt=config.get('EMD').as_float('hp_dt'),
+                      outputs=config.get('EMD').as_list('outputs'),
+                      visualization_interval=config.get('EMD').as_int('visualization_interval'),
+                      fov=np.radians(config.get('EMD').as_float('fov')),
+                      mounting_offset=np.radians(config.get('EMD').as_float('mounting_offset')))
+if config.get('EMD').as_bool('bank'):
+    emd = EMDBank(input_queue=queues['emd_in'],
+                  output_queue=queues['zmq_socket_in'],
+                  width=config.get('Unwarper').as_int('width'),
+                  height=config.get('Unwarper').as_int('height'),
+                  tunings=zip(map(float, config.get('EMD').as_list('bank_lp_rc')),
+                              map(float, config.get('EMD').as_list('bank_hp_rc'))),
+                  lp_dt=config.get('EMD').as_float('lp_dt'),
+                  hp_dt=config.get('EMD').as_float('hp_dt'),
+                  levels=config.get('EMD').as_int('bank_levels'),
+                  outputs=config.get('EMD').as_list('outputs'),
+                  visualization_interval=config.get('EMD').as_int('visualization_interval'),
+                  fov=np.radians(config.get('EMD').as_float('fov')),
+                  mounting_offset=np.radians(config.get('EMD').as_float('mounting_offset')))
+elif config.get('EMD').as_bool('fixed_point'):
+    emd = FixedPointEMD(**emd_parameters)
+elif config.get('EMD').as_int('bands') > 1:
+    emd = TiledEMD(bands=config.get('EMD').as_int('bands'), **emd_parameters)
+else:
+    emd = EMD(**emd_parameters)
 
+'''
 calibration = Calibration(input_queue=queues['calibration_in'],
                           calibration_file=None)
 '''
 
-pub = Publisher(input_queue=queues['zmq_socket_in'])
+pub = Publisher(input_queue=queues['zmq_socket_in'],
+                codecs=config['Publisher']['codecs'],
+                default_codec=config['Publisher']['default_codec'])
 sub = Subscriber(output_queue=queues['zmq_socket_out'])
 
+if config['Pipeline']['mode'] == 'fused':
+    # Run all stages in this process, the output can be viewed with a separate subscriber
+    pipeline = FusedPipeline(camera, unwarper, emd, pub,
+                             report_interval=config.get('Pipeline').as_int('report_interval'))
+    pipeline.run()
 
-# Start tasks
-camera.start()
-#unwarper.start()
-#emd.start()
-#calibration.start()
-pub.start()
-sub.start()
+else:
+    # Start tasks
+    camera.start()
+    unwarper.start()
+    emd.start()
+    #calibration.start()
+    pub.start()
+    sub.start()
 
-while True:
-    camera_output = queues['camera_out'].get()
-    queues['zmq_socket_in'].put(camera_output)
-    sub_output = queues['zmq_socket_out'].get()
-    cv2.imshow('camera',sub_output['camera_image'])
-    cv2.waitKey(1)
+    while True:
+        # Stop if the camera process died (e.g. because the device does not deliver the configured resolution)
+        try:
+            sub_output = queues['zmq_socket_out'].get(timeout=1.0)
+        except Queue.Empty:
+            if not camera.is_alive() and camera.exitcode:
+                raise SystemExit('Camera process exited with code ' + str(camera.exitcode) + '!')
+            continue
+        if 'nearness_map_normalized' in sub_output:
+            cv2.imshow('nearness', sub_output['nearness_map_normalized'])
+        cv2.waitKey(1)
@@ -0,0 +1,108 @@
+"""
+Implements a pipeline running all processing stages in a single process
+"""
+
+from tracing.trace import add_span, copy_trace, monotonic
+
+# Stages of the pipeline in processing order
+STAGES = ('grab', 'remap', 'emd', 'publish')
+
+
+class FusedPipeline(object):
+    """
+    This class chains the stage logic of Camera, Unwarper, EMD and Publisher in a single loop within one process. On
+    targets with few cores this avoids the IPC copies and context switches of running every stage as a separate
+    multiprocessing.Process. The stage objects are used without being started, buffers are reused across frames.
+    """
+
+    def __init__(self, camera, unwarper, emd, publisher, report_interval=100):
+        """
+        Constructor of the FusedPipeline class
+
+        :param camera: Camera instance (not started)
+        :param unwarper: Unwarper instance (not started)
+        :param emd: EMD instance (not started)
+        :param publisher: Publisher instance (not started)
+        :param report_interval: number of frames between printed timing reports (no reports if 0)
+        """
+        self._camera = camera
+        self._unwarper = unwarper
+        self._emd = emd
+        self._publisher = publisher
+        self._report_interval = report_interval
+
+        # Accumulated time per stage in seconds and number of frames processed
+        self._timings = dict((stage, 0.0) for stage in STAGES)
+        self._frames = 0
+
+    def run(self, max_frames=None):
+        """
+        Runs the pipeline until interrupted, the camera reaches the end of its stream or max_frames frames are
+        processed
+
+        :param max_frames: maximum number of frames to process (no limit if None)
+        """
+        remapped_image = None
+
+        self._camera.open()
+        self._publisher.open()
+
+        try:
+            while max_frames is None or self._frames < max_frames:
+                t_start = monotonic()
+
+                # Grab image, stop at the end of the stream
+                data = self._camera.grab()
+                if data is None:
+                    break
+                t_grab = monotonic()
+
+                # Remap image into the reused output buffer
+                remapped_image = self._unwarper.remap(data['camera_image'], out=remapped_image)
+                t_remap = monotonic()
+
+                # Update EMD array
+                output = self._emd.update(remapped_image)
+                t_emd = monotonic()
+
+                # Trace stages
+                copy_trace(data, output)
+                add_span(output, 'unwarper', t_grab, t_remap)
+                add_span(output, 'emd', t_remap, t_emd)
+
+                # Publish output. The nearness map is copied since the socket may send it after the next update.
+                if 'nearness_map' in output:
+                    output['nearness_map'] = output['nearness_map'].copy()
+                self._publisher.publish(output)
+                t_publish = monotonic()
+
+                self._timings['grab'] += t_grab - t_start
+                self._timings['remap'] += t_remap - t_grab
+                self._timings['emd'] += t_emd - t_remap
+                self._timings['publish'] += t_publish - t_emd
+                self._frames += 1
+
+                if self._report_interval and self._frames % self._report_interval == 0:
+                    self.report()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._camera.close()
+            self._publisher.close()
+
+    def report(self):
+        """
+        Prints the mean time spent per frame in each stage and the resulting frame rate
+        """
+        timings = self.timings()
+        total = sum(timings.values())
+
+        print ' '.join('%s: %.2f ms' % (stage, timings[stage] * 1e3) for stage in STAGES) + \
+            ' | total: %.2f ms (%.1f fps)' % (total * 1e3, 1.0 / total if total > 0 else 0.0)
+
+    def timings(self):
+        """
+        :return: dict containing the mean time per frame in seconds for each stage
+        """
+        frames = max(self._frames, 1)
+        return dict((stage, self._timings[stage] / frames) for stage in STAGES)
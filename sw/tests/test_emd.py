@@ -0,0 +1,128 @@
+"""
+Tests the in-place EMD against the previous np.roll based implementation.
+
+Run from the sw directory:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+from image_processing.motion_detection.EMD import EMD
+
+
+def multiply_neighbours(frame, framen):
+    """
+    Previous correlation kernel of the EMD based on np.roll
+    """
+    framenshifteddown = np.roll(framen, 1, axis=0)
+    framenshiftedright = np.roll(framen, 1, axis=1)
+    framenshiftedup = np.roll(framen, -1, axis=0)
+    framenshiftedleft = np.roll(framen, -1, axis=1)
+
+    hrzmultright = np.multiply(frame, framenshiftedleft)
+    hrzmultleft = np.multiply(frame, framenshiftedright)
+    vertmultdown = np.multiply(frame, framenshiftedup)
+    vertmultup = np.multiply(frame, framenshifteddown)
+
+    hrzmultleft = np.roll(hrzmultleft, -1, axis=1)
+    vertmultup = np.roll(vertmultup, -1, axis=0)
+
+    return hrzmultleft, vertmultup, hrzmultright, vertmultdown
+
+
+class ReferenceEMD(object):
+    """
+    Previous EMD update allocating new arrays for every intermediate result
+    """
+
+    def __init__(self, width, height, lp_rc, lp_dt, hp_rc, hp_dt):
+        self._lp_alpha = float(lp_dt) / (lp_rc + lp_dt)
+        self._hp_alpha = float(hp_rc) / (hp_rc + hp_dt)
+        self._img = np.zeros(shape=(height, width))
+        self._hpimg = np.zeros(shape=(height, width))
+        self._lpimg = np.zeros(shape=(height, width))
+
+    def update(self, img):
+        oldimg = self._img
+        self._img = img.astype(np.float64)
+
+        self._hpimg = self._hp_alpha * (self._hpimg + self._img - oldimg)
+        self._lpimg = self._lp_alpha * self._hpimg + (1 - self._lp_alpha) * self._lpimg
+
+        hmult_l, vmult_u, hmult_r, vmult_d = multiply_neighbours(self._lpimg, self._hpimg)
+        hemd = hmult_l - hmult_r
+        vemd = vmult_u - vmult_d
+
+        return np.log(np.multiply(hemd, hemd) + np.multiply(vemd, vemd) + np.exp(0))
+
+
+class TestEMD(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+
+    def test_correlate_neighbours(self):
+        """
+        The slice based correlation is bit-identical to the np.roll based correlation
+        """
+        frame = self.rng.uniform(-50, 50, size=(16, 24)).astype(np.float32)
+        framen = self.rng.uniform(-50, 50, size=(16, 24)).astype(np.float32)
+
+        hemd = np.empty_like(frame)
+        vemd = np.empty_like(frame)
+        EMD._correlate_neighbours(frame, framen, hemd, vemd, np.empty_like(frame))
+
+        hmult_l, vmult_u, hmult_r, vmult_d = multiply_neighbours(frame, framen)
+        assert_array_equal(hemd, hmult_l - hmult_r)
+        assert_array_equal(vemd, vmult_u - vmult_d)
+
+    def test_update(self):
+        """
+        The in-place update matches the previous implementation over a sequence of frames
+        """
+        width, height = 32, 8
+        emd = EMD(None, None, width, height, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0)
+        reference = ReferenceEMD(width, height, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0)
+
+        for _ in range(20):
+            img = self.rng.randint(0, 256, size=(height, width)).astype(np.uint8)
+            actual = emd.update(img)['nearness_map']
+            expected = reference.update(img)
+            assert_allclose(actual, expected, rtol=1e-4, atol=1e-4)
+
+    def test_update_allocation_free(self):
+        """
+        The nearness map is written to the same buffer on every update
+        """
+        emd = EMD(None, None, 32, 8, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0, outputs=('nearness_map',))
+        first = emd.update(self.rng.randint(0, 256, size=(8, 32)).astype(np.uint8))['nearness_map']
+        second = emd.update(self.rng.randint(0, 256, size=(8, 32)).astype(np.uint8))['nearness_map']
+        self.assertIs(first, second)
+
+    def test_single_output(self):
+        """
+        A single output given as a plain string (as read from the configuration) selects that output only
+        """
+        emd = EMD(None, None, 32, 8, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0, outputs='COMANV')
+        data = emd.update(self.rng.randint(0, 256, size=(8, 32)).astype(np.uint8))
+        self.assertEqual(sorted(data), ['COMANV'])
+
+    def test_float2uint8(self):
+        """
+        Normalization into preallocated buffers gives the same result as the allocating version
+        """
+        image = self.rng.uniform(0, 10, size=(8, 32)).astype(np.float32)
+        out = np.empty(image.shape, dtype=np.uint8)
+
+        expected = EMD.float2uint8(image)
+        actual = EMD.float2uint8(image, out=out, scratch=np.empty_like(image))
+        self.assertIs(actual, out)
+        assert_array_equal(actual, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Tests the EMD bank against separate EMD instances.
+
+Run from the sw directory:
+
+    python -m unittest discover tests
+"""
+
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+
+from image_processing.motion_detection.EMD import EMD
+from image_processing.motion_detection.EMDBank import EMDBank
+
+
+class TestEMDBank(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.RandomState(0)
+        self.width, self.height = 32, 8
+
+    def frames(self, n=20):
+        return [self.rng.randint(0, 256, size=(self.height, self.width)).astype(np.uint8) for _ in range(n)]
+
+    def test_single_tuning(self):
+        """
+        A bank with one tuning and one level equals the EMD
+        """
+        emd = EMD(None, None, self.width, self.height, lp_rc=10.0, lp_dt=1.0, hp_rc=5.0, hp_dt=1.0)
+        bank = EMDBank(None, None, self.width, self.height, [(10.0, 5.0)], lp_dt=1.0, hp_dt=1.0)
+
+        for img in self.frames():
+            expected = emd.update(img)
+            actual = bank.update(img)
+            assert_allclose(actual['nearness_map'], expected['nearness_map'], rtol=1e-5, atol=1e-5)
+            assert_allclose(actual['COMANV'], expected['COMANV'], rtol=1e-4, atol=1e-4)
+
+    def test_tunings(self):
+        """
+        The combined nearness map is computed from the motion energy averaged over the tunings, also for tunings
+        with different high-pass filters given in mixed order
+        """
+        tunings = [(5.0, 5.0), (10.0, 2.0), (20.0, 5.0), (2.5, 2.0), (40.0, 5.0)]
+        emds = [EMD(None, None, self.width, self.height, lp_rc=lp_rc, lp_dt=1.0, hp_rc=hp_rc, hp_dt=1.0)
+                for lp_rc, hp_rc in tunings]
+        bank = EMDBank(None, None, self.width, self.height, tunings, lp_dt=1.0, hp_dt=1.0)
+
+        for img in self.frames():
+            energy = np.mean([np.expm1(emd.update(img)['nearness_map'].astype(np.float64)) for emd in emds], axis=0)
+            actual = bank.update(img)['nearness_map']
+            assert_allclose(actual, np.log1p(energy), rtol=1e-4, atol=1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
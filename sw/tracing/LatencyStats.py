@@ -0,0 +1,133 @@
+"""
+Implements the aggregation of frame traces into per-stage latency statistics
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from tracing.trace import FRAME_ID_KEY, TRACE_KEY
+
+
+class LatencyStats(object):
+    """
+    This class aggregates the traces of received frames (see tracing.trace) into per-stage statistics:
+
+    - duration: time a stage spent processing a frame (exit - enter)
+    - latency: time from entering the origin stage (capture) until a stage finished the frame, e.g. the latency of
+      stage 'emd' is the capture-to-COMANV latency
+
+    Frames missing from the sequence of frame ids are counted as dropped.
+    """
+
+    def __init__(self, origin='camera'):
+        """
+        Constructor of the LatencyStats class
+
+        :param origin: stage the latencies are measured from
+        """
+        self._origin = origin
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all collected statistics
+        """
+        self._durations = defaultdict(list)
+        self._latencies = defaultdict(list)
+        self._stages = []
+        self._last_frame_id = None
+        self._received = 0
+        self._dropped = 0
+
+    def add(self, data):
+        """
+        Adds the trace of a received frame
+
+        :param data: data dict containing frame_id and trace
+        """
+        frame_id = data.get(FRAME_ID_KEY)
+        if frame_id is None:
+            return
+
+        # Count gaps in the frame sequence as drops
+        if self._last_frame_id is not None and frame_id > self._last_frame_id + 1:
+            self._dropped += frame_id - self._last_frame_id - 1
+        self._last_frame_id = frame_id
+        self._received += 1
+
+        trace = data.get(TRACE_KEY, [])
+        t_origin = None
+        for stage, t_enter, _ in trace:
+            if stage == self._origin:
+                t_origin = t_enter
+                break
+
+        for stage, t_enter, t_exit in trace:
+            if stage not in self._stages:
+                self._stages.append(stage)
+            self._durations[stage].append(t_exit - t_enter)
+            if t_origin is not None:
+                self._latencies[stage].append(t_exit - t_origin)
+
+    @property
+    def received(self):
+        """
+        :return: number of frames received
+        """
+        return self._received
+
+    @property
+    def dropped(self):
+        """
+        :return: number of frames dropped between origin and receiver
+        """
+        return self._dropped
+
+    def percentiles(self, q=(50, 90, 99)):
+        """
+        Computes percentiles of the per-stage durations and latencies
+
+        :param q: percentiles to compute
+        :return: dict mapping stage names to dicts {'duration': [...], 'latency': [...]} of percentiles in seconds
+        """
+        result = {}
+        for stage in self._stages:
+            result[stage] = {'duration': list(np.percentile(self._durations[stage], q)),
+                             'latency': list(np.percentile(self._latencies[stage], q))
+                             if self._latencies[stage] else None}
+        return result
+
+    def histogram(self, stage, bins=20, latency=True):
+        """
+        Computes a histogram of the latencies (or durations) of a stage
+
+        :param stage: name of the stage
+        :param bins: number of bins or bin edges (see np.histogram)
+        :param latency: uses latencies if set to true, durations otherwise
+        :return: counts, bin edges in seconds
+        """
+        values = self._latencies[stage] if latency else self._durations[stage]
+        return np.histogram(values, bins=bins)
+
+    def report(self, q=(50, 99)):
+        """
+        Formats the statistics as a table
+
+        :param q: percentiles to report
+        :return: report string
+        """
+        percentiles = self.percentiles(q)
+        names = ['p%d' % p for p in q]
+
+        lines = ['frames: %d received, %d dropped' % (self._received, self._dropped),
+                 '{:>12} '.format('stage') +
+                 ' '.join('{:>14}'.format('duration ' + n) for n in names) + ' ' +
+                 ' '.join('{:>14}'.format('latency ' + n) for n in names) + '  [ms]']
+        for stage in self._stages:
+            duration = percentiles[stage]['duration']
+            latency = percentiles[stage]['latency'] or [float('nan')] * len(q)
+            lines.append('{:>12} '.format(stage) +
+                         ' '.join('{:>14.2f}'.format(d * 1e3) for d in duration) + ' ' +
+                         ' '.join('{:>14.2f}'.format(l * 1e3) for l in latency))
+        return '\n'.join(lines)
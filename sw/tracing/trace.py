@@ -0,0 +1,80 @@
+"""
+Implements per-stage latency tracing of the frames passed through the pipeline.
+
+Every frame gets a sequence number (key 'frame_id') when it is captured. Each stage appends a span
+(stage, t_enter, t_exit) to the list under key 'trace' and copies frame_id and trace into the data dict it outputs,
+so the full history of a frame arrives at the Publisher and Subscriber. Timestamps are taken from a monotonic clock,
+which is shared by all processes on one host. Spans recorded on different hosts (e.g. Subscriber) are therefore only
+comparable within a host.
+"""
+
+import ctypes
+import ctypes.util
+import time
+
+FRAME_ID_KEY = 'frame_id'
+TRACE_KEY = 'trace'
+
+try:
+    from time import monotonic
+except ImportError:
+    # Python 2: read CLOCK_MONOTONIC via clock_gettime
+    class _Timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    CLOCK_MONOTONIC = 1
+
+    try:
+        _clock_gettime = ctypes.CDLL(ctypes.util.find_library('rt') or 'librt.so.1', use_errno=True).clock_gettime
+        _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+    except (OSError, AttributeError):
+        _clock_gettime = None
+
+    def monotonic():
+        """
+        :return: time of a monotonic clock in seconds
+        """
+        if _clock_gettime is None:
+            return time.time()
+
+        t = _Timespec()
+        if _clock_gettime(CLOCK_MONOTONIC, ctypes.byref(t)) != 0:
+            raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+        return t.tv_sec + t.tv_nsec * 1e-9
+
+
+def start_trace(data, frame_id):
+    """
+    Starts the trace of a newly captured frame
+
+    :param data: data dict of the frame
+    :param frame_id: sequence number of the frame
+    """
+    data[FRAME_ID_KEY] = frame_id
+    data[TRACE_KEY] = []
+
+
+def copy_trace(src, dst):
+    """
+    Copies frame id and trace from the input data dict of a stage to its output data dict
+
+    :param src: input data dict
+    :param dst: output data dict
+    """
+    if src is not None and FRAME_ID_KEY in src:
+        dst[FRAME_ID_KEY] = src[FRAME_ID_KEY]
+        dst[TRACE_KEY] = list(src.get(TRACE_KEY, []))
+
+
+def add_span(data, stage, t_enter, t_exit=None):
+    """
+    Appends the span of a stage to the trace of a frame
+
+    :param data: data dict of the frame
+    :param stage: name of the stage
+    :param t_enter: monotonic time the stage started processing the frame
+    :param t_exit: monotonic time the stage finished processing the frame (now if None)
+    """
+    if t_exit is None:
+        t_exit = monotonic()
+    data.setdefault(TRACE_KEY, []).append((stage, t_enter, t_exit))
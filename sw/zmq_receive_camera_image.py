@@ -4,13 +4,14 @@ from configobj import ConfigObj
 import cv2
 
 from zmq_socket.Subscriber import Subscriber
+from ipc.LatestValueChannel import LatestValueChannel
 
 # Parse confifiguration file
 config_file = 'config.ini'
 config = ConfigObj(config_file)
 
 # Initialize queues
-queues = {'subscriber_out': multiprocessing.Queue()}
+queues = {'subscriber_out': LatestValueChannel()}
 
 # Initialize tasks
 sub = Subscriber(output_queue=queues['subscriber_out'],
@@ -0,0 +1,37 @@
+import argparse
+import time
+
+from zmq_socket.Recorder import Recorder
+
+# Parse command line arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('path',
+                    type=str,
+                    help='Specify the base path of the message log')
+parser.add_argument('-i', '--ip',
+                    default='raspberrypi',
+                    type=str,
+                    dest='ip',
+                    help='Specify the IP address of the publisher')
+parser.add_argument('-p', '--port',
+                    default=55555,
+                    type=int,
+                    dest='port',
+                    help='Specify the port of the publisher')
+args = parser.parse_args()
+
+# Initialize tasks
+recorder = Recorder(path=args.path,
+                    ip=args.ip,
+                    port=args.port)
+
+# Start tasks
+recorder.start()
+
+# Record until interrupted
+try:
+    while True:
+        time.sleep(1)
+except KeyboardInterrupt:
+    recorder.terminate()
+    recorder.join()
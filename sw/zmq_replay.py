@@ -0,0 +1,34 @@
+import argparse
+
+from zmq_socket.Replayer import Replayer
+
+# Parse command line arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('path',
+                    type=str,
+                    help='Specify the base path of the message log')
+parser.add_argument('-p', '--port',
+                    default=55555,
+                    type=int,
+                    dest='port',
+                    help='Specify the port to publish on')
+parser.add_argument('-s', '--speed',
+                    default=1.0,
+                    type=float,
+                    dest='speed',
+                    help='Specify the replay speed relative to the original rate (0: as fast as possible)')
+parser.add_argument('-l', '--loop',
+                    action='store_true',
+                    dest='loop',
+                    help='Replay the log in an endless loop')
+args = parser.parse_args()
+
+# Initialize tasks
+replayer = Replayer(path=args.path,
+                    port=args.port,
+                    speed=args.speed,
+                    loop=args.loop)
+
+# Start tasks
+replayer.start()
+replayer.join()
@@ -5,6 +5,8 @@ import cv2
 
 from camera.picamera.PiCameraClient import Camera
 from zmq_socket.Publisher import Publisher
+from ipc.FrameRing import FrameRing
+from ipc.LatestValueChannel import LatestValueChannel
 
 
 # Parse confifiguration file
@@ -12,17 +14,22 @@ config_file = 'config.ini'
 config = ConfigObj(config_file)
 
 # Initialize queues
-queues = {'camera_out': multiprocessing.Queue(),
-          'publisher_in': multiprocessing.JoinableQueue()
+# Camera images are passed through shared memory, the frame shape follows from the configured resolution
+camera_width, camera_height = map(int, config['Camera']['resolution'])
+queues = {'camera_out': FrameRing('camera_image', shape=(camera_height, camera_width)),
+          'publisher_in': LatestValueChannel()
           }
 
 # Initialize tasks
 camera = Camera(output_queue=queues['camera_out'],
+                resolution=(camera_width, camera_height),
                 #roi_vertical=map(int, config['Camera']['roi_vertical']),
                 #roi_horizontal=map(int, config['Camera']['roi_horizontal'])
                 )
 
-pub = Publisher(input_queue=queues['publisher_in'])
+pub = Publisher(input_queue=queues['publisher_in'],
+                codecs=config['Publisher']['codecs'],
+                default_codec=config['Publisher']['default_codec'])
 
 # Start tasks
 camera.start()
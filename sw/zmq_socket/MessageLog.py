@@ -0,0 +1,153 @@
+"""
+Implements a segmented, append-only on-disk log of raw ZMQ messages.
+
+A log consists of numbered segments, each made of a data file and an index file:
+
+    <path>.<segment>.log    records of the form: n_frames (uint32), then per frame: length (uint64), frame bytes
+    <path>.<segment>.idx    one entry per record: offset (uint64), length (uint64), receive time (float64)
+
+All integers are little-endian. A new segment is started once the data file exceeds the segment size.
+"""
+
+import glob
+import mmap
+import os
+import struct
+
+import numpy as np
+
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u8'), ('t_receive', '<f8')])
+
+_FRAME_COUNT = struct.Struct('<I')
+_FRAME_LENGTH = struct.Struct('<Q')
+
+
+def _segment_paths(path, segment):
+    return '%s.%05d.log' % (path, segment), '%s.%05d.idx' % (path, segment)
+
+
+class MessageLogWriter(object):
+    """
+    This class appends raw multipart messages to a message log
+    """
+
+    def __init__(self, path, segment_size=256 * 1024 * 1024):
+        """
+        Constructor of the MessageLogWriter class
+
+        :param path: base path of the log; segments are written to <path>.<segment>.log/.idx
+        :param segment_size: size in bytes after which a new segment is started
+        """
+        self._path = path
+        self._segment_size = segment_size
+
+        # Start a new segment after the existing ones
+        self._segment = len(glob.glob(path + '.*.log'))
+        self._data_file = None
+        self._index_file = None
+        self._offset = 0
+
+        self._open_segment()
+
+    def append(self, frames, t_receive):
+        """
+        Appends a message to the log
+
+        :param frames: list of message frames (zmq.Frame or other objects exposing the buffer interface)
+        :param t_receive: receive time of the message
+        """
+        if self._offset >= self._segment_size:
+            self.close()
+            self._segment += 1
+            self._open_segment()
+
+        length = _FRAME_COUNT.size
+        self._data_file.write(_FRAME_COUNT.pack(len(frames)))
+        for frame in frames:
+            buf = np.frombuffer(frame, dtype=np.uint8)
+            self._data_file.write(_FRAME_LENGTH.pack(buf.nbytes))
+            self._data_file.write(buf)
+            length += _FRAME_LENGTH.size + buf.nbytes
+        self._data_file.flush()
+
+        # Write index entry after the data so the index never points beyond the data file
+        entry = np.array([(self._offset, length, t_receive)], dtype=INDEX_DTYPE)
+        self._index_file.write(entry.tostring())
+        self._index_file.flush()
+
+        self._offset += length
+
+    def close(self):
+        """
+        Closes the current segment
+        """
+        if self._data_file is not None:
+            self._data_file.close()
+            self._index_file.close()
+            self._data_file = None
+            self._index_file = None
+
+    def _open_segment(self):
+        data_path, index_path = _segment_paths(self._path, self._segment)
+        self._data_file = open(data_path, 'ab')
+        self._index_file = open(index_path, 'ab')
+        self._offset = os.path.getsize(data_path)
+
+
+class MessageLogReader(object):
+    """
+    This class reads raw multipart messages from a message log. Data files are memory-mapped, the frames returned
+    are uint8 arrays viewing the mapped files.
+    """
+
+    def __init__(self, path):
+        """
+        Constructor of the MessageLogReader class
+
+        :param path: base path of the log (see MessageLogWriter)
+        """
+        self._path = path
+        self._segments = sorted(glob.glob(path + '.*.log'))
+
+        if not self._segments:
+            raise IOError('No message log found at ' + path + '!')
+
+    def __len__(self):
+        return sum(len(self._read_index(data_path)) for data_path in self._segments)
+
+    def messages(self):
+        """
+        Iterates over the messages of the log
+
+        :return: generator yielding (receive time, list of frames) tuples
+        """
+        for data_path in self._segments:
+            index = self._read_index(data_path)
+            if len(index) == 0:
+                continue
+
+            with open(data_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            data = np.frombuffer(mapped, dtype=np.uint8)
+
+            for offset, _, t_receive in index:
+                yield t_receive, self._read_frames(data, int(offset))
+
+    @staticmethod
+    def _read_index(data_path):
+        index_path = data_path[:-len('.log')] + '.idx'
+        return np.fromfile(index_path, dtype=INDEX_DTYPE)
+
+    @staticmethod
+    def _read_frames(data, offset):
+        n_frames = _FRAME_COUNT.unpack_from(data, offset)[0]
+        offset += _FRAME_COUNT.size
+
+        frames = []
+        for _ in range(n_frames):
+            length = _FRAME_LENGTH.unpack_from(data, offset)[0]
+            offset += _FRAME_LENGTH.size
+            frames.append(data[offset:offset + length])
+            offset += length
+
+        return frames
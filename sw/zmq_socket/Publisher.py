@@ -1,21 +1,29 @@
-#import cPickle as pickle
-import pickle
-import msgpack
 import multiprocessing
-import zlib
 import zmq
 import time
 
+from tracing.trace import add_span, monotonic
+from zmq_socket.codec import get_codec
+from zmq_socket.message import pack_message
+
+# Time in milliseconds queued messages are still sent for after the socket was closed
+LINGER = 1000
+
 
 class Publisher(multiprocessing.Process):
 
-    def __init__(self, input_queue, ip='*', port=55555, append_timestamp=True):
+    def __init__(self, input_queue, ip='*', port=55555, append_timestamp=True, codecs=None, default_codec='none',
+                 hwm=2):
         """
         Constructor of the Publisher class.
 
-        :param input_queue: multiprocessing.Queue containing input data
+        :param input_queue: multiprocessing.Queue or ipc.LatestValueChannel containing input data
         :param ip: IP address of the publisher socket
         :param port: port of the publisher socket
+        :param codecs: dict mapping keys of the input data to codec specs (e.g. {'camera_image': 'jpeg:90'}), see
+                       zmq_socket.codec
+        :param default_codec: codec spec for keys not found in codecs
+        :param hwm: maximum number of messages queued by the socket, newer messages are dropped when reached
         """
 
         # Initialize multiprocessing.Process parent
@@ -32,6 +40,11 @@ class Publisher(multiprocessing.Process):
         self._port = port
         self._data = None
         self._append_timestamp = append_timestamp
+        self._codecs = dict((key, get_codec(spec)) for key, spec in (codecs or {}).items())
+        self._default_codec = get_codec(default_codec)
+        self._hwm = hwm
+        self._context = None
+        self._socket = None
 
     def run(self):
         """
@@ -43,29 +56,75 @@ class Publisher(multiprocessing.Process):
         self._exit.clear()
 
         # Setup 0MQ publisher socket for sending data from the server
-        context = zmq.Context()
-        socket = context.socket(zmq.PUB)
-        server_string = "tcp://" + str(self._ip) + ":" + str(self._port)
-        socket.bind(server_string)
+        self.open()
 
         # While exit event is not set...
         while not self._exit.is_set():
-            # ...clear input queue
-            self._clear_queue(self._input_queue)
-
             # Get data from input queue
-            self._parse_input(append_timestamp=self._append_timestamp)
+            self._parse_input()
+
+            # Stop at the end of the stream
+            if self._data is None:
+                break
+
+            # Publish data
+            self.publish(self._data)
+            self._data = None
+
+        # Release the socket
+        self.close()
+
+    def open(self):
+        """
+        Sets up the 0MQ publisher socket. Called by run, only needs to be called directly if the publisher is used
+        without starting the process. Does nothing if the socket is already set up.
+        """
+        if self._socket is not None:
+            return
+
+        self._context = zmq.Context()
+        self._socket = self._context.socket(zmq.PUB)
+
+        # Bound the number of queued messages. ZMQ_CONFLATE cannot be used since it does not support multipart
+        # messages.
+        self._socket.setsockopt(zmq.SNDHWM, self._hwm)
+        server_string = "tcp://" + str(self._ip) + ":" + str(self._port)
+        self._socket.bind(server_string)
 
-            if self._data is not None:
-                # Pack data into message
-                msg = msgpack.packb(self._data)
+    def close(self):
+        """
+        Closes the 0MQ publisher socket so that its port can be bound again. Called at the end of run, only needs to be
+        called directly if the publisher is used without starting the process. Does nothing if the socket is not set
+        up.
+        """
+        if self._socket is None:
+            return
+
+        self._socket.close(linger=LINGER)
+        self._context.term()
+        self._socket = None
+        self._context = None
+
+    def publish(self, data):
+        """
+        Publishes a data dict
+
+        :param data: dict containing the data to be sent
+        """
+        t_enter = monotonic()
 
-                # Publish message
-                try:
-                    socket.send(msg)
-                    self._data = None
-                except zmq.ZMQError as e:
-                    print('Could not send message via 0MQ with error: %s' % e)
+        if self._append_timestamp:
+            data['t_stamp'] = time.time()
+
+        # Pack data into message frames
+        add_span(data, 'publisher', t_enter)
+        frames = pack_message(data, self._codecs, self._default_codec)
+
+        # Publish message without copying the array buffers
+        try:
+            self._socket.send_multipart(frames, copy=False)
+        except zmq.ZMQError as e:
+            print('Could not send message via 0MQ with error: %s' % e)
 
     def terminate(self):
         """
@@ -74,33 +133,9 @@ class Publisher(multiprocessing.Process):
         # Set exit event
         self._exit.set()
 
-    def _parse_input(self, append_timestamp=False):
+    def _parse_input(self):
         """
         Parse data from input queue
         """
         # Get data from queue
         self._data = self._input_queue.get()
-
-        if self._data is not None:
-            if append_timestamp:
-                self._data['t_stamp']=time.time()
-                print self._data['t_stamp']
-            # For every item in data dict
-            for key, item in self._data.items():
-                self._data[key] = zlib.compress(
-                    pickle.dumps(self._data[key], protocol=0))
-        else:
-            pass
-
-    @staticmethod
-    def _clear_queue(some_queue):
-        """
-        Clears the multiprocessing queue passed to the method
-
-        :param some_queue: multiprocessing.Queue to be cleared
-        """
-        while not some_queue.empty():
-            try:
-                some_queue.get_nowait()
-            except Queue.Empty:
-                pass
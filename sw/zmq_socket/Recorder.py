@@ -0,0 +1,80 @@
+import multiprocessing
+import zmq
+import time
+
+from zmq_socket.MessageLog import MessageLogWriter
+
+
+class Recorder(multiprocessing.Process):
+    """
+    A subscriber that appends every received message (raw frames plus receive time) to a message log.
+    """
+
+    def __init__(self, path,
+                 ip='localhost', port=55555, hwm=1000,
+                 segment_size=256 * 1024 * 1024):
+        """
+        Constructor of the Recorder class.
+
+        :param path: base path of the message log (see zmq_socket.MessageLog)
+        :param ip: IP address of the publisher socket
+        :param port: port of the publisher socket
+        :param hwm: maximum number of messages queued by the socket; kept high so no messages are dropped
+        :param segment_size: size in bytes after which a new log segment is started
+        """
+
+        # Initialize multiprocessing.Process parent
+        multiprocessing.Process.__init__(self)
+
+        # Exit event for stopping process
+        self._exit = multiprocessing.Event()
+
+        # Initialize variables
+        self._path = path
+        self._ip = ip
+        self._port = port
+        self._hwm = hwm
+        self._segment_size = segment_size
+
+    def run(self):
+        """
+        Function called when task is started (e.g. task.start()). Overrides run function of multiprocessing.Process
+        parent
+        """
+
+        # Clear exit event just to be sure
+        self._exit.clear()
+
+        # Setup ZMQ subscriber socket
+        context = zmq.Context()
+        socket = context.socket(zmq.SUB)
+        socket.setsockopt(zmq.RCVHWM, self._hwm)
+
+        # Subscribe to all messages from server
+        socket.setsockopt(zmq.SUBSCRIBE, '')
+        server_string = "tcp://" + str(self._ip) + ":" + str(self._port)
+        socket.connect(server_string)
+
+        # Poll with timeout so the exit event is checked regularly
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+
+        log = MessageLogWriter(self._path, segment_size=self._segment_size)
+
+        # While exit event is not set...
+        while not self._exit.is_set():
+            if not poller.poll(100):
+                continue
+
+            # ...append raw message to the log
+            frames = socket.recv_multipart(copy=False)
+            log.append(frames, time.time())
+
+        log.close()
+
+    def terminate(self):
+        """
+        Called when task is terminated. Overwrites multiprocessing.Process.terminate() function
+        """
+        # Set exit event
+        self._exit.set()
@@ -0,0 +1,93 @@
+import multiprocessing
+import zmq
+import time
+
+from zmq_socket.MessageLog import MessageLogReader
+
+
+class Replayer(multiprocessing.Process):
+    """
+    A publisher that re-emits the messages of a message log, either at the original rate or as fast as possible.
+    """
+
+    def __init__(self, path,
+                 ip='*', port=55555, hwm=1000,
+                 speed=1.0, loop=False, startup_delay=0.5):
+        """
+        Constructor of the Replayer class.
+
+        :param path: base path of the message log (see zmq_socket.MessageLog)
+        :param ip: IP address of the publisher socket
+        :param port: port of the publisher socket
+        :param hwm: maximum number of messages queued by the socket
+        :param speed: replay speed relative to the original rate; 0 replays as fast as possible
+        :param loop: restarts from the beginning of the log when its end is reached if set to true
+        :param startup_delay: time in seconds to wait after binding so subscribers can connect
+        """
+
+        # Initialize multiprocessing.Process parent
+        multiprocessing.Process.__init__(self)
+
+        # Exit event for stopping process
+        self._exit = multiprocessing.Event()
+
+        # Initialize variables
+        self._path = path
+        self._ip = ip
+        self._port = port
+        self._hwm = hwm
+        self._speed = speed
+        self._loop = loop
+        self._startup_delay = startup_delay
+
+    def run(self):
+        """
+        Function called when task is started (e.g. task.start()). Overrides run function of multiprocessing.Process
+        parent
+        """
+
+        # Clear exit event just to be sure
+        self._exit.clear()
+
+        # An empty log would make the replay loop spin without ever sleeping
+        reader = MessageLogReader(self._path)
+        if len(reader) == 0:
+            print('Message log %s contains no messages' % self._path)
+            return
+
+        # Setup 0MQ publisher socket
+        context = zmq.Context()
+        socket = context.socket(zmq.PUB)
+        socket.setsockopt(zmq.SNDHWM, self._hwm)
+        server_string = "tcp://" + str(self._ip) + ":" + str(self._port)
+        socket.bind(server_string)
+        time.sleep(self._startup_delay)
+
+        while not self._exit.is_set():
+            t_start = None
+
+            for t_receive, frames in reader.messages():
+                if self._exit.is_set():
+                    break
+
+                # Wait until the message is due at the requested speed
+                if self._speed > 0:
+                    if t_start is None:
+                        t_start = time.time()
+                        t_first = t_receive
+                    delay = t_start + (t_receive - t_first) / self._speed - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                # Frames are views on the memory-mapped log and are sent without copying
+                socket.send_multipart(frames, copy=False)
+
+            if not self._loop:
+                break
+
+    def terminate(self):
+        """
+        Called when task is terminated. Overwrites multiprocessing.Process.terminate() function
+        """
+        # Set exit event
+        self._exit.set()
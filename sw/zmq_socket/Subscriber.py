@@ -1,15 +1,22 @@
 import multiprocessing
 import zmq
-import msgpack
-#import cPickle as pickle
-import pickle
-import zlib
 import time
 
+from tracing.trace import add_span, monotonic
+from zmq_socket.message import unpack_message
+
 class Subscriber(multiprocessing.Process):
 
     def __init__(self, output_queue,
-                 ip='localhost', port=55555):
+                 ip='localhost', port=55555, hwm=2):
+        """
+        Constructor of the Subscriber class.
+
+        :param output_queue: multiprocessing.Queue or ipc.LatestValueChannel receiving the output data
+        :param ip: IP address of the publisher socket
+        :param port: port of the publisher socket
+        :param hwm: maximum number of messages queued by the socket, newer messages are dropped when reached
+        """
 
         # Initialize multiprocessing.Process parent
         multiprocessing.Process.__init__(self)
@@ -23,6 +30,7 @@ class Subscriber(multiprocessing.Process):
         # Initialize variables
         self._ip = ip
         self._port = port
+        self._hwm = hwm
 
     def run(self):
 
@@ -33,6 +41,10 @@ class Subscriber(multiprocessing.Process):
         context = zmq.Context()
         socket = context.socket(zmq.SUB)
 
+        # Bound the number of queued messages (must be set before connecting). ZMQ_CONFLATE cannot be used since it
+        # does not support multipart messages.
+        socket.setsockopt(zmq.RCVHWM, self._hwm)
+
         # Subscribe to all messages from server
         socket.setsockopt(zmq.SUBSCRIBE, '')
         server_string = "tcp://" + str(self._ip) + ":" + str(self._port)
@@ -41,12 +53,12 @@ class Subscriber(multiprocessing.Process):
         # While exit event is not set...
         while not self._exit.is_set():
             # ...get data from server
-            buf = socket.recv()
-            data = msgpack.unpackb(buf)
+            frames = socket.recv_multipart(copy=False)
+            t_enter = monotonic()
 
-            # ... unpickle and uncompress data
-            for key, item in data.iteritems():
-                data[key] = pickle.loads(zlib.decompress(item))
+            # ... rebuild data without copying the array buffers
+            data = unpack_message(frames)
+            add_span(data, 'subscriber', t_enter)
 
             self._output_queue.put(data)
 
@@ -0,0 +1,139 @@
+"""
+Implements the codecs applied to the items of a message before they are sent.
+
+Codecs are configured per key with a spec string of the form 'name[:parameter]':
+
+    none        no compression
+    zlib[:N]    zlib with compression level N (default 1)
+    lz4         LZ4 frame compression (requires the lz4 package)
+    jpeg[:Q]    JPEG with quality Q (default 90), 8-bit images only
+    png[:N]     PNG with compression level N (default 1), 8/16-bit images only
+
+Only the codec name is sent along with the item, the parameters are not needed for decoding.
+"""
+
+import zlib
+
+import cv2
+import numpy as np
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+class Codec(object):
+    """
+    Base class of the codecs. Byte codecs compress the raw bytes of an item, image codecs encode arrays directly.
+    """
+    name = None
+    image_codec = False
+
+    def encode(self, item):
+        """
+        Encodes an item
+
+        :param item: bytes-like object (byte codecs) or array (image codecs)
+        :return: encoded bytes-like object
+        """
+        raise NotImplementedError
+
+    def decode(self, buf):
+        """
+        Decodes an item
+
+        :param buf: bytes-like object holding the encoded item
+        :return: decoded bytes-like object (byte codecs) or array (image codecs)
+        """
+        raise NotImplementedError
+
+
+class NoneCodec(Codec):
+    name = 'none'
+
+    def encode(self, item):
+        return item
+
+    def decode(self, buf):
+        return buf
+
+
+class ZlibCodec(Codec):
+    name = 'zlib'
+
+    def __init__(self, level=1):
+        self._level = int(level)
+
+    def encode(self, item):
+        return zlib.compress(item, self._level)
+
+    def decode(self, buf):
+        return zlib.decompress(buf)
+
+
+class LZ4Codec(Codec):
+    name = 'lz4'
+
+    def __init__(self):
+        if lz4 is None:
+            raise ImportError('The lz4 codec requires the lz4 package!')
+
+    def encode(self, item):
+        return lz4.frame.compress(item)
+
+    def decode(self, buf):
+        return lz4.frame.decompress(buf)
+
+
+class ImageCodec(Codec):
+    image_codec = True
+
+    def __init__(self, extension, params):
+        self._extension = extension
+        self._params = params
+
+    def encode(self, item):
+        success, buf = cv2.imencode(self._extension, item, self._params)
+        if not success:
+            raise ValueError('Could not encode item as ' + self.name + '!')
+        return buf
+
+    def decode(self, buf):
+        return cv2.imdecode(np.frombuffer(buf, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+class JPEGCodec(ImageCodec):
+    name = 'jpeg'
+
+    def __init__(self, quality=90):
+        ImageCodec.__init__(self, '.jpg', [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+
+
+class PNGCodec(ImageCodec):
+    name = 'png'
+
+    def __init__(self, compression=1):
+        ImageCodec.__init__(self, '.png', [int(cv2.IMWRITE_PNG_COMPRESSION), int(compression)])
+
+
+CODECS = {codec.name: codec for codec in (NoneCodec, ZlibCodec, LZ4Codec, JPEGCodec, PNGCodec)}
+
+
+def get_codec(spec):
+    """
+    Creates a codec from its spec string
+
+    :param spec: codec spec of the form 'name[:parameter]' (e.g. 'zlib:6')
+    :return: Codec instance
+    """
+    name, _, parameter = str(spec).partition(':')
+
+    try:
+        codec_class = CODECS[name]
+    except KeyError:
+        raise ValueError('Unknown codec ' + name + '!')
+
+    if parameter:
+        return codec_class(parameter)
+    return codec_class()
@@ -0,0 +1,104 @@
+"""
+Implements the wire format of the messages exchanged between Publisher and Subscriber.
+
+A message is sent as a ZMQ multipart message. The first frame is a msgpack header describing the items of the data
+dict, every following frame holds the payload of one item:
+
+    header = [[key, kind, dtype, shape, codec], ...]
+
+NumPy arrays (kind 'ndarray') are sent as their raw buffer and rebuilt with np.frombuffer on the receiving side, so
+neither side copies the array data unless a codec is applied. All other items (kind 'pickle') are pickled. The codec
+name tells the receiving side how to decode the payload (see zmq_socket.codec).
+"""
+
+import pickle
+
+import msgpack
+import numpy as np
+
+from zmq_socket.codec import NoneCodec, get_codec
+
+KIND_NDARRAY = 'ndarray'
+KIND_PICKLE = 'pickle'
+
+# Codec instances used for decoding, by codec name
+_decoders = {}
+
+
+def pack_message(data, codecs=None, default_codec=None):
+    """
+    Packs a data dict into the frames of a multipart message
+
+    :param data: dict containing the data to be sent
+    :param codecs: dict mapping keys to Codec instances
+    :param default_codec: Codec instance for keys not found in codecs (no compression if None)
+    :return: list of frames; uncompressed array payloads reference the array memory
+    """
+    if codecs is None:
+        codecs = {}
+    if default_codec is None:
+        default_codec = NoneCodec()
+
+    header = []
+    frames = [None]
+
+    for key, item in data.items():
+        codec = codecs.get(key, default_codec)
+
+        if isinstance(item, np.ndarray) and item.dtype != object:
+            # Only non-contiguous arrays are copied
+            item = np.ascontiguousarray(item)
+            header.append([key, KIND_NDARRAY, item.dtype.str, list(item.shape), codec.name])
+            frames.append(codec.encode(item))
+        else:
+            if codec.image_codec:
+                raise ValueError('Codec ' + codec.name + ' can only be applied to arrays, not to key ' + str(key) + '!')
+            header.append([key, KIND_PICKLE, None, None, codec.name])
+            frames.append(codec.encode(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    frames[0] = msgpack.packb(header, use_bin_type=True)
+
+    return frames
+
+
+def unpack_message(frames):
+    """
+    Unpacks the frames of a multipart message into a data dict
+
+    :param frames: list of zmq.Frame objects as returned by socket.recv_multipart(copy=False) (or other objects
+                   exposing the buffer interface, e.g. bytes or uint8 arrays)
+    :return: dict containing the received data. Uncompressed arrays are read-only views on the received frames.
+    """
+    header = msgpack.unpackb(_to_bytes(frames[0]), raw=False)
+
+    if len(header) != len(frames) - 1:
+        raise ValueError('Message header describes %d items but %d payload frames were received!'
+                         % (len(header), len(frames) - 1))
+
+    data = {}
+    for (key, kind, dtype, shape, codec_name), frame in zip(header, frames[1:]):
+        try:
+            codec = _decoders[codec_name]
+        except KeyError:
+            codec = _decoders[codec_name] = get_codec(codec_name)
+
+        payload = codec.decode(frame)
+
+        if kind == KIND_NDARRAY:
+            if codec.image_codec:
+                data[key] = payload.reshape(shape)
+            else:
+                data[key] = np.frombuffer(payload, dtype=np.dtype(dtype)).reshape(shape)
+        elif kind == KIND_PICKLE:
+            data[key] = pickle.loads(_to_bytes(payload))
+        else:
+            raise ValueError('Unknown item kind ' + str(kind) + ' for key ' + str(key) + '!')
+
+    return data
+
+
+def _to_bytes(buf):
+    """
+    Copies an object exposing the buffer interface into a bytes object
+    """
+    return memoryview(buf).tobytes()
@@ -0,0 +1,45 @@
+import argparse
+import multiprocessing
+
+from tracing.LatencyStats import LatencyStats
+from zmq_socket.Subscriber import Subscriber
+
+# Parse command line arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('-i', '--ip',
+                    default='localhost',
+                    type=str,
+                    dest='ip',
+                    help='Specify the IP address of the publisher')
+parser.add_argument('-p', '--port',
+                    default=55555,
+                    type=int,
+                    dest='port',
+                    help='Specify the port of the publisher')
+parser.add_argument('-n', '--report-interval',
+                    default=500,
+                    type=int,
+                    dest='report_interval',
+                    help='Specify the number of frames between reports')
+args = parser.parse_args()
+
+# Initialize queues. Every message is kept so that drops are only counted where they happen in the pipeline.
+queues = {'subscriber_out': multiprocessing.Queue()}
+
+# Initialize tasks
+sub = Subscriber(output_queue=queues['subscriber_out'],
+                 ip=args.ip,
+                 port=args.port)
+
+# Start tasks
+sub.start()
+
+# Aggregate traces of the received frames
+stats = LatencyStats()
+while True:
+    stats.add(queues['subscriber_out'].get())
+
+    if stats.received == args.report_interval:
+        print stats.report()
+        print
+        stats.reset()